@@ -0,0 +1,83 @@
+"""
+Micro-benchmark da decodificação de pacotes RobotControl.
+
+Compara, em pacotes por segundo:
+    - protobuf: RobotControl().ParseFromString + leitura dos campos por atributos (caminho original)
+    - rapido:   WheelVelocityDecoder lendo direto de um buffer reutilizado
+
+Uso:
+    python benchmarks/bench_decoder.py [--packets 200000] [--robots 1 3 6]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from communicators import WheelVelocityDecoder
+from proto.ssl_simulation_robot_control_pb2 import RobotControl
+
+
+def build_packet(robots):
+    message = RobotControl()
+    for robot_id in range(robots):
+        command = message.robot_commands.add()
+        command.id = robot_id
+        wheels = command.move_command.wheel_velocity
+        wheels.front_right = 1.5 + robot_id
+        wheels.back_right = -2.25
+        wheels.back_left = 3.125
+        wheels.front_left = -4.0
+        command.kick_speed = 1.0
+    return message.SerializeToString()
+
+
+def bench_protobuf(packet, packets):
+    start = time.perf_counter()
+    for _ in range(packets):
+        message = RobotControl()
+        message.ParseFromString(packet)
+        for command in message.robot_commands:
+            command.id
+            command.move_command.wheel_velocity.front_right
+            command.move_command.wheel_velocity.back_right
+            command.move_command.wheel_velocity.back_left
+            command.move_command.wheel_velocity.front_left
+            command.kick_speed
+    return packets / (time.perf_counter() - start)
+
+
+def bench_fast(packet, packets):
+    decoder = WheelVelocityDecoder()
+    buffer = bytearray(65536)
+    view = memoryview(buffer)
+    nbytes = len(packet)
+    buffer[:nbytes] = packet
+    start = time.perf_counter()
+    for _ in range(packets):
+        decoder.decode(view, nbytes)
+    return packets / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--packets', type=int, default=200000)
+    parser.add_argument('--robots', type=int, nargs='+', default=[1, 3, 6])
+    args = parser.parse_args()
+
+    print(f"{'robôs':>6} {'bytes':>6} {'protobuf (pkt/s)':>18} {'rapido (pkt/s)':>16} {'ganho':>7}")
+    for robots in args.robots:
+        packet = build_packet(robots)
+
+        # Confere se os dois caminhos concordam antes de medir
+        decoder = WheelVelocityDecoder()
+        assert decoder.decode(packet, len(packet)) == robots
+
+        protobuf = bench_protobuf(packet, args.packets)
+        fast = bench_fast(packet, args.packets)
+        print(f"{robots:>6} {len(packet):>6} {protobuf:>18.0f} {fast:>16.0f} {fast / protobuf:>6.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Latência do UDP até a serial: envio a taxa fixa (Agendador) x encaminhamento por evento
+(AgendadorEventos).
+
+Monta a ponte completa com Receiver (modo 'event', lote), laço de controle e ComunicacaoSerial
+escrevendo em um pseudo-terminal. Um marcador vai na roda frontal esquerda do robô 0 de cada
+datagrama; a leitura do outro lado do pty registra quando o quadro com aquele marcador sai
+na serial. Os datagramas são enviados em instantes aleatórios, sem relação com os ticks.
+
+Uso:
+    python benchmarks/bench_encaminhamento.py [--rate 40] [--duration 5] [--fps 60] [--gap 6]
+"""
+import os
+import sys
+import tty
+import time
+import random
+import select
+import socket
+import struct
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from communicators import Receiver, ComunicacaoSerial, CodificadorComando, MontadorQuadro
+from scheduler import Agendador, AgendadorEventos
+from comum import build_packet, percentile, cpu_time
+
+QUADRO = struct.Struct('<15i')
+MARCADOR = 10       # Posição da roda frontal esquerda do robô 0 no quadro (robôs 2, 1, 0)
+
+
+def ler_quadros(master, parada, saida_em, contagem):
+    """Lê o lado mestre do pty e registra o instante em que cada marcador aparece."""
+    rx = bytearray()
+    while not parada.is_set():
+        prontos, _, _ = select.select([master], [], [], 0.05)
+        if not prontos:
+            continue
+        agora = time.perf_counter()
+        rx += os.read(master, 4096)
+        n_quadros = len(rx) // QUADRO.size
+        for k in range(n_quadros):
+            marcador = QUADRO.unpack_from(rx, k * QUADRO.size)[MARCADOR]
+            contagem[0] += 1
+            if marcador not in saida_em:
+                saida_em[marcador] = agora
+        del rx[:n_quadros * QUADRO.size]
+
+
+def run_mode(modo, port, rate, duration, fps, gap):
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    comunicador = ComunicacaoSerial(os.ttyname(slave), iniciar_leitura=False, reconectar=False)
+
+    receiver = Receiver(port=port)
+    receiver.start_thread(mode='event', batch=True)
+    if modo == 'evento':
+        agendador = AgendadorEventos(gap, 1 / fps)
+        receiver.on_update = agendador.notificar
+    else:
+        agendador = Agendador(fps)
+
+    # Escala 1 e sem inversão: o marcador chega intacto no quadro
+    montador = MontadorQuadro(escala=1, inverter=1)
+    codificador = CodificadorComando(montador.n_valores, enquadrado=False)
+
+    parada = threading.Event()
+
+    def controle():
+        while not parada.is_set():
+            agendador.esperar()
+            comunicador.enviar_comando(codificador.codificar(montador.montar(receiver.state.snapshot())))
+
+    saida_em = {}
+    quadros = [0]
+    threads = [threading.Thread(target=controle, daemon=True),
+               threading.Thread(target=ler_quadros, args=(master, parada, saida_em, quadros), daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    aleatorio = random.Random(1)
+    n_pacotes = int(rate * duration)
+    packets = [build_packet(seq, 'front_left') for seq in range(1, n_pacotes + 1)]
+    sent_at = {}
+    cpu_start = cpu_time()
+    start = time.perf_counter()
+    for seq, packet in enumerate(packets, start=1):
+        time.sleep(aleatorio.uniform(0.5, 1.5) / rate)
+        sent_at[seq] = time.perf_counter()
+        sender.sendto(packet, ('localhost', port))
+    time.sleep(0.2)
+    elapsed = time.perf_counter() - start
+    cpu = cpu_time() - cpu_start
+
+    parada.set()
+    for thread in threads:
+        thread.join()
+    receiver.stop_thread()
+    receiver.socket.close()
+    sender.close()
+    comunicador.fechar()
+    os.close(master)
+    os.close(slave)
+
+    latencies = [(saida_em[seq] - sent_at[seq]) * 1e3 for seq in sent_at if seq in saida_em]
+    return {
+        'mode': modo,
+        'received': len(latencies),
+        'sent': len(sent_at),
+        'p50_ms': percentile(latencies, 50),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': max(latencies) if latencies else float('nan'),
+        'frames_s': quadros[0] / elapsed,
+        'cpu_s': cpu,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=40, help='Datagramas por segundo (média)')
+    parser.add_argument('--duration', type=float, default=5, help='Duração (s) de cada modo')
+    parser.add_argument('--fps', type=float, default=60, help='Taxa fixa / keepalive (Hz)')
+    parser.add_argument('--gap', type=float, default=6, help='Intervalo mínimo entre quadros no modo evento (ms)')
+    parser.add_argument('--port', type=int, default=10341)
+    args = parser.parse_args()
+
+    print(f"{'modo':>7} {'recebidos':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9} "
+          f"{'quadros/s':>10} {'CPU (s)':>8}")
+    for modo in ('fixo', 'evento'):
+        r = run_mode(modo, args.port, args.rate, args.duration, args.fps, args.gap / 1e3)
+        print(f"{r['mode']:>7} {r['received']:>5}/{r['sent']:<4} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+              f"{r['max_ms']:>9.2f} {r['frames_s']:>10.0f} {r['cpu_s']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
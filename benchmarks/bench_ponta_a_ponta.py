@@ -0,0 +1,311 @@
+"""
+Benchmark de ponta a ponta da ponte: Actuator.send_wheelVelocity_message -> UDP -> Receiver ->
+laço de controle (MontadorQuadro/CodificadorComando via TransmissoresSerial) ->
+ComunicacaoSerial.enviar_comando -> pseudo-terminal.
+
+Tudo roda em loopback e em ptys (um por transmissor, 3 robôs cada, como em main.py). O Actuator
+envia de um processo separado, então o CPU medido é só o do processo da ponte (incluindo as
+threads que leem os ptys para a medição). Cada comando leva um número de sequência na roda
+frontal esquerda do robô; a latência vai da chamada ao Actuator até o quadro com aquele
+número sair no pty. Comandos substituídos antes do próximo tick não aparecem na serial e não
+entram na latência.
+
+Modos do laço de controle (--modo, vários separados por vírgula para comparar na mesma
+execução):
+    fixo:       ponte com threads, Agendador a --fps (como em main.py)
+    evento:     ponte com threads, AgendadorEventos com keepalive a --fps
+    asyncio:    PonteAssincrona (bridge_async.py), recepção, tick e serial em um laço asyncio;
+                um único transmissor, então só com até 3 robôs
+O jitter do tick é o atraso do despertar em relação ao prazo nos modos fixo e asyncio, e o
+atraso entre o aviso do Receiver e o tick no modo evento.
+
+Para cada modo e quantidade de robôs, as taxas são testadas em ordem crescente. A taxa máxima
+sustentável é a maior em que o Receiver recebeu pelo menos 99% dos datagramas enviados e o
+p99 da latência ficou abaixo de --max-p99.
+
+Uso:
+    python benchmarks/bench_ponta_a_ponta.py [--robots 3,6,11] [--rates 60,300,1000] [--duration 3]
+                                             [--fps 60] [--modo fixo,evento,asyncio] [--enquadrado]
+                                             [--json resultados.json]
+"""
+import os
+import sys
+import tty
+import json
+import time
+import asyncio
+import select
+import struct
+import argparse
+import platform
+import threading
+import subprocess
+import multiprocessing
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RAIZ)
+
+from communicators import (Receiver, ComunicacaoSerial, TransmissoresSerial, MontadorQuadro, COMANDO_SYNC,
+                            COMANDO_CRC)
+from scheduler import Agendador, AgendadorEventos
+from bridge_async import PonteAssincrona
+from comum import percentile, cpu_time
+
+ROBOS_POR_TRANSMISSOR = 3
+MODOS = ('fixo', 'evento', 'asyncio')
+
+
+def grupos_de_robos(n_robos):
+    """Divide os robôs entre transmissores como em main.py: (2, 1, 0), (5, 4, 3), ..."""
+    grupos = []
+    for inicio in range(0, n_robos, ROBOS_POR_TRANSMISSOR):
+        fim = min(inicio + ROBOS_POR_TRANSMISSOR, n_robos)
+        grupos.append(tuple(range(fim - 1, inicio - 1, -1)))
+    return grupos
+
+
+def enviar_comandos(porta, porta_atuador, n_robos, taxa, duracao, conexao):
+    """
+    Processo filho: a cada período envia um comando por robô com o Actuator e devolve pela
+    conexão a lista de (robô, sequência, instante do envio).
+    """
+    from proto.actuator import Actuator
+
+    atuador = Actuator(port=porta_atuador, team_port=porta)
+    periodo = 1 / taxa
+    enviados = []
+    conexao.recv()      # Espera a ponte estar pronta
+    inicio = time.perf_counter()
+    proximo = inicio
+    seq = 0
+    while proximo - inicio < duracao:
+        espera = proximo - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+        seq += 1
+        for id_robo in range(n_robos):
+            instante = time.perf_counter()
+            # wheel_bl vai para front_left no Actuator
+            atuador.send_wheelVelocity_message(id_robo, float(seq), 0.0, 0.0, 0.0, 0)
+            enviados.append((id_robo, seq, instante))
+        proximo += periodo
+    atuador.socket.close()
+    conexao.send(enviados)
+    conexao.close()
+
+
+def ler_quadros(master, robos, cabecalho, tamanho, parada, saida_em, contagem):
+    """Lê o lado mestre de um pty e registra quando cada (robô, sequência) aparece."""
+    valores = struct.Struct(f'<{5 * len(robos)}i')
+    rx = bytearray()
+    while not parada.is_set():
+        prontos, _, _ = select.select([master], [], [], 0.05)
+        if not prontos:
+            continue
+        agora = time.perf_counter()
+        rx += os.read(master, 65536)
+        n_quadros = len(rx) // tamanho
+        for k in range(n_quadros):
+            marcas = valores.unpack_from(rx, k * tamanho + cabecalho)
+            contagem[0] += 1
+            for posicao, id_robo in enumerate(robos):
+                marca = marcas[5 * posicao]
+                if marca and (id_robo, marca) not in saida_em:
+                    saida_em[(id_robo, marca)] = agora
+        del rx[:n_quadros * tamanho]
+
+
+def executar(n_robos, taxa, duracao, fps, modo, enquadrado, porta):
+    grupos = grupos_de_robos(n_robos)
+
+    # Um pty por transmissor; o lado escravo é a "porta serial" da ponte
+    ptys = []
+    for _ in grupos:
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        ptys.append((master, slave))
+    receiver = Receiver(port=porta, n_robots=n_robos)
+    parada = threading.Event()
+
+    if modo == 'asyncio':
+        # O laço asyncio atende o socket do Receiver e a porta; nenhuma thread da ponte
+        comunicador = ComunicacaoSerial(os.ttyname(ptys[0][1]), iniciar_leitura=False, escrita_assincrona=False,
+                                        reconectar=False)
+        ponte = PonteAssincrona(receiver, comunicador, fps, enquadrado=enquadrado, robos=grupos[0])
+        # Escala 1 e sem inversão: o número de sequência chega intacto no quadro
+        ponte.montador = MontadorQuadro(grupos[0], escala=1, inverter=1)
+        agendador = ponte
+
+        def controle():
+            asyncio.run(ponte.executar())
+
+        def parar_controle():
+            ponte._loop.call_soon_threadsafe(ponte.parar)
+
+        def fechar_ponte():
+            comunicador.fechar()
+    else:
+        transmissores = TransmissoresSerial([(os.ttyname(slave), robos) for (_, slave), robos in zip(ptys, grupos)],
+                                            enquadrado, iniciar_leitura=False, reconectar=False)
+        transmissores.montadores = [MontadorQuadro(robos, escala=1, inverter=1) for robos in grupos]
+
+        receiver.start_thread(mode='event', batch=True)
+        if modo == 'evento':
+            agendador = AgendadorEventos(keepalive=1 / fps)
+            receiver.on_update = agendador.notificar
+        else:
+            agendador = Agendador(fps)
+
+        def controle():
+            while not parada.is_set():
+                agendador.esperar()
+                transmissores.enviar(receiver.state.snapshot())
+
+        def parar_controle():
+            pass        # O laço confere `parada` a cada tick
+
+        def fechar_ponte():
+            receiver.stop_thread()
+            transmissores.fechar()
+
+    cabecalho = len(COMANDO_SYNC) + 2 if enquadrado else 0
+    saida_em = {}
+    quadros = [0]
+    threads = []
+    for (master, _), robos in zip(ptys, grupos):
+        tamanho = cabecalho + 20 * len(robos) + (COMANDO_CRC.size if enquadrado else 0)
+        threads.append(threading.Thread(target=ler_quadros, daemon=True,
+                                        args=(master, robos, cabecalho, tamanho, parada, saida_em, quadros)))
+    for thread in threads:
+        thread.start()
+
+    contexto = multiprocessing.get_context('spawn')
+    conexao, conexao_filho = contexto.Pipe()
+    remetente = contexto.Process(target=enviar_comandos,
+                                 args=(porta, porta + 1, n_robos, taxa, duracao, conexao_filho))
+    remetente.start()
+    time.sleep(0.2)
+
+    # O laço de controle só começa com a medição: os quadros e o jitter do aquecimento
+    # (importação do Actuator no filho) não entram nos resultados
+    threads.append(threading.Thread(target=controle, daemon=True))
+    threads[-1].start()
+    cpu_inicio = cpu_time()
+    inicio = time.perf_counter()
+    conexao.send(True)
+    enviados = conexao.recv()
+    time.sleep(0.1)     # Deixa os últimos quadros saírem
+    decorrido = time.perf_counter() - inicio
+    cpu = cpu_time() - cpu_inicio
+    remetente.join()
+
+    parada.set()
+    parar_controle()
+    for thread in threads:
+        thread.join()
+    jitter = agendador.estatisticas_jitter()
+    stats = receiver.get_stats()
+    fechar_ponte()
+    receiver.socket.close()
+    for master, slave in ptys:
+        os.close(master)
+        os.close(slave)
+
+    latencias = [(saida_em[(id_robo, seq)] - instante) * 1e3
+                 for id_robo, seq, instante in enviados if (id_robo, seq) in saida_em]
+    duracao_envio = (enviados[-1][2] - enviados[0][2]) if len(enviados) > 1 else duracao
+    return {
+        'robots': n_robos,
+        'rate': taxa,
+        'mode': modo,
+        'framed': enquadrado,
+        'sent': len(enviados),
+        'sent_rate': len(enviados) / duracao_envio if duracao_envio > 0 else 0.0,
+        'received': stats['datagrams_received'],
+        'forwarded': len(latencias),
+        'p50_ms': percentile(latencias, 50),
+        'p99_ms': percentile(latencias, 99),
+        'max_ms': max(latencias) if latencias else float('nan'),
+        'frames_s': quadros[0] / decorrido,
+        'cpu_percent': 100 * cpu / decorrido,
+        'tick_jitter_p50_ms': jitter['p50'] * 1e3,
+        'tick_jitter_p99_ms': jitter['p99'] * 1e3,
+        'tick_jitter_max_ms': jitter['max'] * 1e3,
+    }
+
+
+def versao_git():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--robots', default='3,6,11', help='Quantidades de robôs, separadas por vírgula')
+    parser.add_argument('--rates', default='60,300,1000', help='Comandos por segundo por robô, separados por vírgula')
+    parser.add_argument('--duration', type=float, default=3, help='Duração (s) de cada medição')
+    parser.add_argument('--fps', type=float, default=60, help='Taxa do laço de controle / keepalive (Hz)')
+    parser.add_argument('--modo', default='fixo', help=f"Laços de controle a medir, separados por vírgula ({', '.join(MODOS)})")
+    parser.add_argument('--enquadrado', action='store_true', help='Comandos com sincronismo, sequência e CRC')
+    parser.add_argument('--max-p99', type=float, default=50, help='p99 (ms) máximo para uma taxa ser sustentável')
+    parser.add_argument('--port', type=int, default=10360)
+    parser.add_argument('--json', default=None, help='Arquivo para gravar os resultados em JSON')
+    args = parser.parse_args()
+
+    robos = [int(n) for n in args.robots.split(',')]
+    taxas = sorted(float(t) for t in args.rates.split(','))
+    modos = args.modo.split(',')
+    for modo in modos:
+        if modo not in MODOS:
+            parser.error(f"modo desconhecido: '{modo}' (use {', '.join(MODOS)})")
+
+    print(f"{'modo':>7} {'robôs':>5} {'taxa':>6} {'enviados/s':>10} {'recebidos':>13} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'max (ms)':>9} {'quadros/s':>9} {'CPU (%)':>8} {'jitter p50/p99/máx (ms)':>23}")
+    resultados = []
+    sustentavel = {}
+    for modo in modos:
+        for n_robos in robos:
+            if modo == 'asyncio' and n_robos > ROBOS_POR_TRANSMISSOR:
+                print(f"{modo:>7} {n_robos:>5}  (ignorado: a ponte asyncio tem um único transmissor)")
+                continue
+            sustentavel[(modo, n_robos)] = None
+            for taxa in taxas:
+                r = executar(n_robos, taxa, args.duration, args.fps, modo, args.enquadrado, args.port)
+                r['sustainable'] = r['received'] >= 0.99 * r['sent'] and r['p99_ms'] <= args.max_p99
+                if r['sustainable']:
+                    sustentavel[(modo, n_robos)] = r['sent_rate']
+                resultados.append(r)
+                jitter = f"{r['tick_jitter_p50_ms']:.3f}/{r['tick_jitter_p99_ms']:.3f}/{r['tick_jitter_max_ms']:.3f}"
+                print(f"{modo:>7} {r['robots']:>5} {r['rate']:>6.0f} {r['sent_rate']:>10.0f} "
+                      f"{r['received']:>6}/{r['sent']:<6} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['max_ms']:>9.2f} "
+                      f"{r['frames_s']:>9.0f} {r['cpu_percent']:>8.1f} {jitter:>23}"
+                      f"{'' if r['sustainable'] else '  (não sustentável)'}")
+
+    for (modo, n_robos), taxa in sustentavel.items():
+        texto = f"{taxa:.0f} datagramas/s" if taxa is not None else "nenhuma das taxas testadas"
+        print(f"Taxa máxima sustentável ({modo}) com {n_robos} robôs: {texto}")
+
+    if args.json:
+        # NaN (nenhuma latência medida) não é JSON válido
+        for r in resultados:
+            for chave, valor in r.items():
+                if isinstance(valor, float) and valor != valor:
+                    r[chave] = None
+        with open(args.json, 'w') as arquivo:
+            json.dump({
+                'commit': versao_git(),
+                'timestamp': time.time(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'args': vars(args),
+                'max_sustainable_rate': {f"{modo}/{n}": taxa for (modo, n), taxa in sustentavel.items()},
+                'results': resultados,
+            }, arquivo, indent=2)
+        print(f"Resultados gravados em {args.json}")
+
+
+if __name__ == '__main__':
+    main()
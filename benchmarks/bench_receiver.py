@@ -0,0 +1,104 @@
+"""
+Benchmark da thread de recepção do Receiver.
+
+Compara o modo 'timer' (RepeatTimer a RECEIVER_FPS) com o modo 'event' (seletor) medindo:
+    - despertares por segundo da thread de recepção, ocioso e sob carga
+    - latência entre o envio do datagrama e a atualização do estado do robô
+    - tempo de CPU consumido pelo processo
+
+Uso:
+    python benchmarks/bench_receiver.py [--rate 300] [--duration 3] [--port 10340]
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from communicators import Receiver
+from comum import build_packet, percentile, cpu_time
+
+
+def run_mode(mode, port, rate, duration):
+    receiver = Receiver(port=port)
+    lock = threading.Lock()
+    decoded_at = {}
+
+    # Instrumentação: registra o instante de atualização do estado. Os despertares vêm de
+    # Receiver.wakeups, contado no próprio laço de cada modo.
+    original_apply = receiver._apply_commands
+
+    def apply_commands(commands, count):
+        original_apply(commands, count)
+        now = time.perf_counter()
+        with lock:
+            for i in range(count):
+                decoded_at[int(commands[i][1])] = now
+
+    receiver._apply_commands = apply_commands
+    receiver.start_thread(mode=mode)
+
+    # Fase ociosa
+    wakeups_start = receiver.wakeups
+    time.sleep(duration / 2)
+    idle_wakeups = (receiver.wakeups - wakeups_start) / (duration / 2)
+
+    # Fase sob carga
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    packets = [build_packet(seq) for seq in range(int(rate * duration))]
+    sent_at = {}
+    wakeups_start = receiver.wakeups
+    cpu_start = cpu_time()
+    start = time.perf_counter()
+    for seq, packet in enumerate(packets):
+        deadline = start + seq / rate
+        while time.perf_counter() < deadline:
+            time.sleep(0.0002)
+        sent_at[seq] = time.perf_counter()
+        sender.sendto(packet, ('localhost', port))
+    time.sleep(0.2)
+    elapsed = time.perf_counter() - start
+    load_wakeups = (receiver.wakeups - wakeups_start) / elapsed
+    cpu = cpu_time() - cpu_start
+
+    receiver.stop_thread()
+    receiver.socket.close()
+    sender.close()
+
+    with lock:
+        latencies = [(decoded_at[seq] - sent_at[seq]) * 1e6 for seq in sent_at if seq in decoded_at]
+
+    return {
+        'mode': mode,
+        'idle_wakeups_s': idle_wakeups,
+        'load_wakeups_s': load_wakeups,
+        'received': len(latencies),
+        'sent': len(sent_at),
+        'p50_us': percentile(latencies, 50),
+        'p99_us': percentile(latencies, 99),
+        'max_us': max(latencies) if latencies else float('nan'),
+        'cpu_s': cpu,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=300, help='Pacotes por segundo enviados')
+    parser.add_argument('--duration', type=float, default=3, help='Duração (s) da fase sob carga')
+    parser.add_argument('--port', type=int, default=10340)
+    args = parser.parse_args()
+
+    print(f"{'modo':>6} {'ocioso/s':>10} {'carga/s':>10} {'recebidos':>10} "
+          f"{'p50 (us)':>10} {'p99 (us)':>10} {'max (us)':>10} {'CPU (s)':>8}")
+    for mode in ('timer', 'event'):
+        r = run_mode(mode, args.port, args.rate, args.duration)
+        print(f"{r['mode']:>6} {r['idle_wakeups_s']:>10.0f} {r['load_wakeups_s']:>10.0f} "
+              f"{r['received']:>5}/{r['sent']:<4} {r['p50_us']:>10.0f} {r['p99_us']:>10.0f} "
+              f"{r['max_us']:>10.0f} {r['cpu_s']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
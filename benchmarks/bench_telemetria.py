@@ -0,0 +1,69 @@
+"""
+Vazão do processamento de telemetria no host: linhas CSV x quadros binários com CRC.
+
+Gera um fluxo com o mesmo conteúdo (3 robôs por mensagem) nos dois formatos, entrega em
+pedaços do tamanho de uma leitura serial típica e mede mensagens e robôs processados por
+segundo, além dos bytes por mensagem (custo no enlace de 115200 bps).
+
+Uso:
+    python benchmarks/bench_telemetria.py [--messages 50000] [--chunk 64]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from communicators import ComunicacaoSerial, montar_quadro_telemetria
+
+ROBOS = 3
+
+
+def parser(telemetria):
+    # Apenas o enquadramento e a interpretação; nenhuma porta é aberta
+    comunicador = ComunicacaoSerial.__new__(ComunicacaoSerial)
+    comunicador.dados_recebidos = {}
+    comunicador._configurar_telemetria(telemetria)
+    return comunicador
+
+
+def blocos(k):
+    return [(id_robo, k & 0xFFFF, 1.5 + k % 7, -2.25, 3.125, -4.0, 0.0123) for id_robo in range(ROBOS)]
+
+
+def mensagem_csv(k):
+    # O CSV não carrega a sequência ecoada
+    return (','.join(f'{b[0]},{b[2]:.3f},{b[3]:.3f},{b[4]:.3f},{b[5]:.3f},{b[6]:.4f}' for b in blocos(k)) + '\n').encode()
+
+
+def medir(telemetria, fluxo, mensagens, chunk):
+    comunicador = parser(telemetria)
+    pedacos = [fluxo[i:i + chunk] for i in range(0, len(fluxo), chunk)]
+    inicio = time.perf_counter()
+    for pedaco in pedacos:
+        comunicador._receber_bytes(pedaco)
+    duracao = time.perf_counter() - inicio
+    assert comunicador.quadros_telemetria == mensagens, (telemetria, comunicador.quadros_telemetria)
+    return mensagens / duracao
+
+
+def main():
+    parser_args = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser_args.add_argument('--messages', type=int, default=50000)
+    parser_args.add_argument('--chunk', type=int, default=64, help='Bytes entregues por leitura')
+    args = parser_args.parse_args()
+
+    csv = b''.join(mensagem_csv(k) for k in range(args.messages))
+    binario = b''.join(montar_quadro_telemetria(blocos(k)) for k in range(args.messages))
+
+    print(f"{'formato':>8} {'bytes/msg':>10} {'msg/s no enlace':>16} {'msg/s host':>12} {'robôs/s host':>14}")
+    for nome, fluxo in (('csv', csv), ('binaria', binario)):
+        bytes_msg = len(fluxo) / args.messages
+        enlace = 115200 / 10 / bytes_msg     # 8N1: 10 bits por byte
+        vazao = medir(nome, fluxo, args.messages, args.chunk)
+        print(f"{nome:>8} {bytes_msg:>10.1f} {enlace:>16.0f} {vazao:>12.0f} {vazao * ROBOS:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
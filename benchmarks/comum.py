@@ -0,0 +1,38 @@
+"""
+Funções compartilhadas pelos benchmarks (não é executável). Os scripts rodam como
+`python benchmarks/<script>.py`, então a pasta benchmarks/ já está no sys.path e basta
+`from comum import ...`.
+"""
+import os
+import sys
+import resource
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from proto.ssl_simulation_robot_control_pb2 import RobotControl
+
+RODAS = ('front_right', 'back_right', 'back_left', 'front_left')
+
+
+def build_packet(seq, roda='front_right'):
+    """Monta um RobotControl do robô 0 com o número de sequência codificado em uma das rodas."""
+    message = RobotControl()
+    command = message.robot_commands.add()
+    command.id = 0
+    wheels = command.move_command.wheel_velocity
+    for nome in RODAS:
+        setattr(wheels, nome, float(seq) if nome == roda else 0.0)
+    return message.SerializeToString()
+
+
+def percentile(values, p):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
@@ -0,0 +1,104 @@
+"""
+Teste de estresse de quadros rasgados entre a thread de recepção e o laço de controle.
+
+Uma thread escritora publica continuamente comandos em que todos os campos de todos os
+robôs carregam o mesmo contador k. Um leitor tira retratos do estado e conta quantos
+misturam valores de escritas diferentes (quadro rasgado). O teste roda:
+    - campos:     escrita campo a campo direto no array, sem o seqlock, como antes
+                  (verifica o time inteiro; serve de controle e deve acusar rasgos)
+    - robo:       RobotStateStore.publish, um robô por vez (verifica cada robô)
+    - time:       RobotStateStore.publish_many (verifica o time inteiro)
+
+Uso:
+    python benchmarks/stress_state_store.py [--duration 3] [--robots 3]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from communicators import RobotStateStore, FRONT_RIGHT, BACK_RIGHT, BACK_LEFT, FRONT_LEFT, KICK
+
+
+def writer_fields(store, stop):
+    k = 0
+    data = store.data
+    while not stop.is_set():
+        k += 1
+        for id_robot in range(store.n_robots):
+            data[id_robot, FRONT_RIGHT] = k
+            data[id_robot, BACK_RIGHT] = k
+            data[id_robot, BACK_LEFT] = k
+            data[id_robot, FRONT_LEFT] = k
+            data[id_robot, KICK] = k
+
+
+def writer_robot(store, stop):
+    k = 0
+    while not stop.is_set():
+        k += 1
+        for id_robot in range(store.n_robots):
+            store.publish(id_robot, k, k, k, k, k)
+
+
+def writer_team(store, stop):
+    k = 0
+    while not stop.is_set():
+        k += 1
+        store.publish_many([(id_robot, k, k, k, k, k) for id_robot in range(store.n_robots)])
+
+
+def run(name, writer, read, per_robot, duration):
+    stop = threading.Event()
+    thread = threading.Thread(target=writer, args=(stop,), daemon=True)
+    thread.start()
+
+    snapshots = 0
+    torn = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        # A coluna LAST_SEEN não entra na verificação
+        commands = read()[:, :KICK + 1]
+        snapshots += 1
+        if per_robot:
+            if (commands != commands[:, :1]).any():
+                torn += 1
+        elif (commands != commands[0, 0]).any():
+            torn += 1
+
+    stop.set()
+    thread.join()
+    print(f"{name:>8} {snapshots:>12} {torn:>10} {snapshots / duration:>14.0f}")
+    return torn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=3)
+    parser.add_argument('--robots', type=int, default=3)
+    args = parser.parse_args()
+
+    # Troca de threads o mais frequente possível para provocar intercalações
+    sys.setswitchinterval(1e-6)
+
+    print(f"{'modo':>8} {'retratos':>12} {'rasgados':>10} {'retratos/s':>14}")
+    store = RobotStateStore(args.robots)
+    run('campos', lambda stop: writer_fields(store, stop), store.data.copy, False, args.duration)
+
+    store = RobotStateStore(args.robots)
+    torn = run('robo', lambda stop: writer_robot(store, stop), store.snapshot, True, args.duration)
+
+    store = RobotStateStore(args.robots)
+    torn += run('time', lambda stop: writer_team(store, stop), store.snapshot, False, args.duration)
+
+    if torn:
+        print("FALHA: RobotStateStore entregou quadros rasgados")
+        sys.exit(1)
+    print("OK: nenhum quadro rasgado com RobotStateStore")
+
+
+if __name__ == '__main__':
+    main()
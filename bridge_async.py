@@ -0,0 +1,244 @@
+import os
+import asyncio
+import numpy as np
+from communicators import Receiver, ComunicacaoSerial, CodificadorComando, MontadorQuadro, TransmissoresSerial
+from recorder import Gravador
+from scheduler import JITTER_WINDOW, resumo_janela
+
+# ---------------------------------------------------------------------------------------------
+#    PONTE SOCKET -> SERIAL EM UM ÚNICO LAÇO ASYNCIO
+# ---------------------------------------------------------------------------------------------
+
+class ReceiverProtocol(asyncio.DatagramProtocol):
+    """
+    Descrição:
+        Protocolo UDP do asyncio que repassa cada datagrama para a decodificação do Receiver.
+    Entradas:
+        receiver:   Instância de Receiver cujo estado será atualizado
+    """
+    def __init__(self, receiver):
+        self.receiver = receiver
+
+    def datagram_received(self, data, addr):
+        self.receiver.process_datagram(data)
+
+    def error_received(self, exc):
+        print("[Receiver] Erro de socket:", exc)
+
+class SerialAssincrona:
+    """
+    Descrição:
+        Leitura e escrita não bloqueantes no descritor da porta aberta pelo ComunicacaoSerial,
+        atendidas pelo próprio laço do asyncio (add_reader/add_writer) em vez de threads.
+    Entradas:
+        loop:           Laço de eventos em execução
+        comunicador:    ComunicacaoSerial criado com iniciar_leitura=False
+    """
+    def __init__(self, loop, comunicador):
+        self.loop = loop
+        self.comunicador = comunicador
+        self.fd = comunicador.ser.fileno()
+        os.set_blocking(self.fd, False)
+
+        self._tx = bytearray()
+        self.quadros_descartados = 0
+
+        self.loop.add_reader(self.fd, self._ao_ler)
+
+    def _ao_ler(self):
+        """Lê o que estiver disponível e repassa para o enquadramento do ComunicacaoSerial."""
+        try:
+            dados = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            print(f"  -> Erro na leitura serial: {e}")
+            return
+
+        if self.comunicador.recorder is not None:
+            self.comunicador.recorder.telemetria(dados)
+        self.comunicador._receber_bytes(dados)
+
+    def escrever(self, dados):
+        """
+        Descrição:
+            Escreve um quadro sem bloquear. O que não couber no buffer do driver é enviado
+            quando o descritor ficar disponível; enquanto isso, novos quadros são descartados
+            para não acumular atraso.
+        Entradas:
+            dados:  Quadro a enviar (bytes ou memoryview)
+        Retorna:
+            True se o quadro foi aceito (escrito ou pendente), False se descartado.
+        """
+        if self._tx:
+            self.quadros_descartados += 1
+            return False
+
+        try:
+            enviados = os.write(self.fd, dados)
+        except BlockingIOError:
+            enviados = 0
+        except OSError as e:
+            print(f"ERRO ao enviar dados: {e}")
+            return False
+
+        # Só os quadros aceitos vão para a gravação
+        if self.comunicador.recorder is not None:
+            self.comunicador.recorder.quadro(dados)
+        if enviados < len(dados):
+            self._tx += dados[enviados:]
+            self.loop.add_writer(self.fd, self._ao_escrever)
+        return True
+
+    def _ao_escrever(self):
+        try:
+            enviados = os.write(self.fd, self._tx)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            print(f"ERRO ao enviar dados: {e}")
+            enviados = len(self._tx)
+
+        del self._tx[:enviados]
+        if not self._tx:
+            self.loop.remove_writer(self.fd)
+
+    def fechar(self):
+        self.loop.remove_reader(self.fd)
+        self.loop.remove_writer(self.fd)
+
+class PonteAssincrona:
+    """
+    Descrição:
+        Executa recepção UDP, tick de controle e E/S serial em um único laço asyncio. O tick
+        é agendado com loop.call_at em prazos absolutos, de modo que um tick atrasado não
+        desloca os seguintes.
+    Entradas:
+        receiver:       Receiver com o socket já criado (não iniciar a thread dele)
+        comunicador:    ComunicacaoSerial criado com iniciar_leitura=False, ou None
+        control_fps:    Taxa de envio para o STM
+        inverter:       -1 para inverter o sentido dos motores, 1 caso contrário
+        logger:         Imprime os valores enviados a cada tick
+        enquadrado:     Envia comandos com sincronismo, sequência e CRC (CodificadorComando)
+        robos:          Robôs do quadro, na ordem da eletrônica
+    """
+    def __init__(self, receiver, comunicador, control_fps=60, inverter=-1, logger=False, enquadrado=False,
+                 robos=(2, 1, 0)):
+        self.receiver = receiver
+        self.comunicador = comunicador
+        self.montador = MontadorQuadro(robos, inverter=inverter)
+        self.codificador = CodificadorComando(self.montador.n_valores, enquadrado)
+        self.periodo = 1 / control_fps
+        self.inverter = inverter
+        self.logger = logger
+
+        self.serial = None
+        self.ticks = 0
+        self.ticks_perdidos = 0
+        self.atrasos = np.zeros(JITTER_WINDOW, dtype=np.float64)
+
+    async def executar(self):
+        """Corrotina principal: roda até ser cancelada ou até parar() ser chamado."""
+        self._loop = asyncio.get_running_loop()
+        self._parada = asyncio.Event()
+
+        transporte, _ = await self._loop.create_datagram_endpoint(
+            lambda: ReceiverProtocol(self.receiver), sock=self.receiver.socket)
+        if self.comunicador:
+            self.serial = SerialAssincrona(self._loop, self.comunicador)
+
+        self._proximo = self._loop.time() + self.periodo
+        self._handle = self._loop.call_at(self._proximo, self._tick)
+        try:
+            await self._parada.wait()
+        finally:
+            self._handle.cancel()
+            transporte.close()
+            if self.serial:
+                self.serial.fechar()
+
+    def parar(self):
+        self._parada.set()
+
+    def _tick(self):
+        agora = self._loop.time()
+        self.atrasos[self.ticks % JITTER_WINDOW] = agora - self._proximo
+        self.ticks += 1
+
+        self.receiver._check_watchdog()
+        valores_para_enviar = self.montador.montar(self.receiver.state.snapshot())
+        if self.logger:
+            print(f"[DEBUG] Lista enviada: {valores_para_enviar.tolist()}")
+
+        if self.serial:
+            if self.serial.escrever(self.codificador.codificar(valores_para_enviar)) and self.codificador.enquadrado:
+                self.comunicador.registrar_envio(self.codificador.seq)
+
+        # Próximo prazo absoluto; se o tick atrasou mais de um período, pula os perdidos
+        self._proximo += self.periodo
+        agora = self._loop.time()
+        if self._proximo <= agora:
+            perdidos = int((agora - self._proximo) / self.periodo) + 1
+            self.ticks_perdidos += perdidos
+            self._proximo += perdidos * self.periodo
+        self._handle = self._loop.call_at(self._proximo, self._tick)
+
+    def estatisticas_jitter(self):
+        """
+        Retorna:
+            Dicionário com p50, p99 e máximo (s) do atraso de cada tick em relação ao prazo,
+            nos últimos JITTER_WINDOW ticks.
+        """
+        return {
+            'ticks': self.ticks,
+            **resumo_janela(self.atrasos, self.ticks),
+            'perdidos': self.ticks_perdidos,
+        }
+
+def run_bridge(receiver_port, serial_port=None, serial_baud_rate=115200, control_fps=60, inverter=-1,
+               logger=False, telemetria='csv', enquadrado=False, gravacao=None, robos=(2, 1, 0), vid_pid=None):
+    """
+    Descrição:
+        Cria Receiver e ComunicacaoSerial para o modo asyncio e executa a ponte até Ctrl+C.
+    Entradas:
+        receiver_port:      Porta UDP dos comandos do software
+        serial_port:        Porta serial do transmissor (None para testar só o socket)
+        serial_baud_rate:   Baud rate da serial
+        control_fps:        Taxa de envio para o STM
+        inverter:           -1 para inverter o sentido dos motores, 1 caso contrário
+        logger:             Imprime os valores enviados a cada tick
+        telemetria:         Formato da telemetria do STM ('csv' ou 'binaria')
+        enquadrado:         Envia comandos com sincronismo, sequência e CRC
+        gravacao:           Caminho do log de gravação (recorder.Gravador) ou None
+        robos:              Robôs do quadro do transmissor, na ordem da eletrônica
+        vid_pid:            (VID, PID) USB do transmissor, para achar a porta (ver descobrir_porta)
+    """
+    gravador = Gravador(gravacao) if gravacao else None
+    receiver = Receiver(port=receiver_port, n_robots=TransmissoresSerial.n_robots([(serial_port, robos)]))
+    receiver.recorder = gravador
+    comunicador = None
+    if serial_port:
+        comunicador = ComunicacaoSerial(serial_port, serial_baud_rate, iniciar_leitura=False,
+                                        telemetria=telemetria, escrita_assincrona=False, reconectar=False,
+                                        vid_pid=vid_pid)
+        comunicador.recorder = gravador
+
+    ponte = PonteAssincrona(receiver, comunicador, control_fps, inverter, logger, enquadrado, robos)
+    try:
+        asyncio.run(ponte.executar())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        jitter = ponte.estatisticas_jitter()
+        print(f"[Ponte] {jitter['ticks']} ticks, jitter p50 {jitter['p50']*1e3:.3f} ms, "
+              f"p99 {jitter['p99']*1e3:.3f} ms, máx {jitter['max']*1e3:.3f} ms, "
+              f"{jitter['perdidos']} ticks perdidos")
+        if ponte.serial:
+            print(f"[Ponte] {ponte.serial.quadros_descartados} quadros descartados na serial")
+            for id_robo, rtt in comunicador.estatisticas_rtt().items():
+                print(f"[Ponte] Robô {id_robo}: RTT p50 {rtt['p50']*1e3:.2f} ms, "
+                      f"p99 {rtt['p99']*1e3:.2f} ms, máx {rtt['max']*1e3:.2f} ms ({rtt['amostras']} amostras)")
+        if comunicador:
+            comunicador.fechar()
+        if gravador:
+            gravador.fechar()
@@ -0,0 +1,183 @@
+import time
+import signal
+import multiprocessing
+from communicators import Receiver, TransmissoresSerial, SharedRobotStateStore, TelemetriaCompartilhada
+from scheduler import Agendador, ESPERA_ATIVA
+from recorder import Gravador
+from metrics import Metricas, ServidorMetricas
+
+# ---------------------------------------------------------------------------------------------
+#    PONTE SOCKET -> SERIAL EM PROCESSOS SEPARADOS
+# ---------------------------------------------------------------------------------------------
+#
+# Processo do Receiver:  socket UDP -> SharedRobotStateStore (escritor único do seqlock)
+# Processo da serial:    SharedRobotStateStore.snapshot -> laço de controle -> TransmissoresSerial;
+#                        telemetria lida -> TelemetriaCompartilhada
+# Processo principal:    inicia os dois, imprime a telemetria e encerra tudo no Ctrl+C
+#
+# Cada processo tem o seu GIL: uma rajada de datagramas ocupa só o processo do Receiver e não
+# atrasa os ticks do laço de controle, e vice-versa.
+#
+# Gravação e métricas ficam no processo que tem os dados: cada um grava o seu arquivo
+# (<gravacao>.receiver e <gravacao>.serial, reproduzíveis separadamente com recorder.py) e
+# serve o seu endpoint (o Receiver no endereço dado, a serial na porta seguinte ou em
+# <caminho>.serial).
+
+def _processo_arquivo(caminho, processo):
+    """Arquivo de gravação de um dos processos."""
+    return f"{caminho}.{processo}" if caminho else None
+
+def _processo_endereco(endereco, processo):
+    """Endereço do endpoint de métricas de um dos processos."""
+    if not endereco or processo == 'receiver':
+        return endereco
+    if isinstance(endereco, str):
+        return f"{endereco}.{processo}"
+    ip, porta = endereco
+    return ip, porta + 1
+
+def _servir_metricas(metricas, endereco, processo):
+    """Inicia o endpoint do processo; um endereço ocupado só desativa as métricas dele."""
+    try:
+        servidor = ServidorMetricas(metricas, endereco)
+        print(f"[{processo}] Métricas em {endereco}")
+        return servidor
+    except OSError as e:
+        print(f"[{processo}] AVISO: endpoint de métricas desativado ({e}).")
+        return None
+
+def _processo_receiver(nome_estado, n_robots, port, mode, batch, gravacao, endereco_metricas, parada):
+    """Executa o Receiver publicando no estado compartilhado até `parada` ser sinalizada."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)     # O Ctrl+C é tratado pelo processo principal
+    estado = SharedRobotStateStore(n_robots, nome_estado)
+    receiver = Receiver(port=port, n_robots=n_robots, state=estado)
+    gravador = Gravador(gravacao) if gravacao else None
+    receiver.recorder = gravador
+    servidor = None
+    if endereco_metricas:
+        metricas = Metricas()
+        metricas.receiver(receiver)
+        servidor = _servir_metricas(metricas, endereco_metricas, 'Receiver')
+
+    receiver.start_thread(mode=mode, batch=batch)
+    try:
+        parada.wait()
+    finally:
+        receiver.stop_thread()
+        receiver.socket.close()
+        if servidor:
+            servidor.fechar()
+        if gravador:
+            gravador.fechar()
+        stats = receiver.get_stats()
+        print(f"[Receiver] {stats['datagrams_received']} datagramas, {stats['decode_errors']} erros, "
+              f"watchdog: {receiver.watchdog_trips.tolist()}")
+        del receiver
+        estado.close()
+
+def _processo_serial(nome_estado, nome_telemetria, n_robots, transmissores, enquadrado, inverter,
+                     control_fps, espera_ativa, politica, gravacao, endereco_metricas, kwargs_serial, parada):
+    """Executa o laço de controle e a E/S serial até `parada` ser sinalizada."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    estado = SharedRobotStateStore(n_robots, nome_estado)
+    telemetria = TelemetriaCompartilhada(n_robots, nome_telemetria)
+    seriais = TransmissoresSerial(transmissores, enquadrado, inverter, **kwargs_serial)
+    gravador = Gravador(gravacao) if gravacao else None
+    seriais.ligar_telemetria(telemetria.registrar)
+    for comunicador in seriais.comunicadores:
+        comunicador.recorder = gravador
+
+    agendador = Agendador(control_fps, espera_ativa=espera_ativa, politica=politica)
+    servidor = None
+    if endereco_metricas:
+        metricas = Metricas()
+        metricas.agendador(agendador)
+        metricas.montadores(seriais.montadores)
+        metricas.serial(seriais.comunicadores)
+        servidor = _servir_metricas(metricas, endereco_metricas, 'Controle')
+    try:
+        while not parada.is_set():
+            seriais.enviar(estado.snapshot())
+            agendador.esperar()
+    finally:
+        jitter = agendador.estatisticas_jitter()
+        print(f"[Controle] {jitter['ticks']} ticks, jitter p50 {jitter['p50']*1e3:.3f} ms, "
+              f"p99 {jitter['p99']*1e3:.3f} ms, máx {jitter['max']*1e3:.3f} ms, "
+              f"{jitter['perdidos']} ticks perdidos")
+        if servidor:
+            servidor.fechar()
+        seriais.fechar()
+        if gravador:
+            gravador.fechar()
+        telemetria.fechar()
+        estado.close()
+
+def run_bridge_multiprocess(receiver_port, transmissores, n_robots=None, control_fps=60, inverter=-1,
+                            enquadrado=False, receiver_mode='event', receiver_batch=True, log_rate=2,
+                            espera_ativa=ESPERA_ATIVA, politica='pular', gravacao=None, endereco_metricas=None,
+                            **kwargs_serial):
+    """
+    Descrição:
+        Cria o estado e a telemetria em memória compartilhada, inicia os processos do Receiver
+        e da serial e executa a ponte até Ctrl+C.
+    Entradas:
+        receiver_port:      Porta UDP dos comandos do software
+        transmissores:      Lista de (porta, robôs), como em TransmissoresSerial (vazia para
+                            testar só o socket)
+        n_robots:           Tamanho do time (None: o necessário para os transmissores, mínimo 3)
+        control_fps:        Taxa de envio para o STM
+        inverter:           -1 para inverter o sentido dos motores, 1 caso contrário
+        enquadrado:         Envia comandos com sincronismo, sequência e CRC
+        receiver_mode:      Modo da thread de recepção ('event' ou 'timer')
+        receiver_batch:     Recepção em lote
+        log_rate:           Impressões da telemetria por segundo (0 desliga)
+        espera_ativa:       Espera ativa (s) do fim de cada tick (ver scheduler.Agendador)
+        politica:           'pular' ou 'recuperar' os ticks atrasados (ver scheduler.Agendador)
+        gravacao:           Prefixo dos logs de gravação (recorder.Gravador), um por processo, ou None
+        endereco_metricas:  Endereço do endpoint de métricas do Receiver (a serial usa o seguinte) ou None
+        **kwargs_serial:    Repassados a cada ComunicacaoSerial (baudrate, telemetria, ...)
+    """
+    if n_robots is None:
+        n_robots = TransmissoresSerial.n_robots(transmissores)
+
+    estado = SharedRobotStateStore(n_robots)
+    telemetria = TelemetriaCompartilhada(n_robots)
+
+    # 'fork': com 'spawn' os filhos reexecutariam o main.py, que não tem guarda de __main__.
+    # Chame antes de iniciar qualquer thread, para o fork não copiar travas em uso.
+    contexto = multiprocessing.get_context('fork')
+    parada = contexto.Event()
+    processos = [contexto.Process(target=_processo_receiver, name='receiver',
+                                  args=(estado.name, n_robots, receiver_port, receiver_mode, receiver_batch,
+                                        _processo_arquivo(gravacao, 'receiver'),
+                                        _processo_endereco(endereco_metricas, 'receiver'), parada))]
+    if transmissores:
+        processos.append(contexto.Process(target=_processo_serial, name='serial',
+                                          args=(estado.name, telemetria.nome, n_robots, transmissores,
+                                                enquadrado, inverter, control_fps, espera_ativa, politica,
+                                                _processo_arquivo(gravacao, 'serial'),
+                                                _processo_endereco(endereco_metricas, 'serial'), kwargs_serial, parada)))
+    for processo in processos:
+        processo.start()
+
+    intervalo = 1 / log_rate if log_rate else 0.5
+    try:
+        while all(processo.is_alive() for processo in processos):
+            time.sleep(intervalo)
+            if not log_rate:
+                continue
+            for id_robo in range(n_robots):
+                dados = telemetria.get_dados(id_robo)
+                if dados:
+                    print(f"[Robô {id_robo}] velocidades {dados['velocidades']}, "
+                          f"latência {dados['latencia']:.4f} s, recebido há {time.time() - dados['timestamp']:.2f} s")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        parada.set()
+        for processo in processos:
+            processo.join(5)
+            if processo.is_alive():
+                processo.terminate()
+        telemetria.fechar()
+        estado.close()
@@ -1,10 +1,59 @@
+import glob
 import time
+import struct
+import fnmatch
+import binascii
 import socket
+import selectors
 import threading
+import numpy as np
 import serial
+from multiprocessing import shared_memory
+from serial.tools import list_ports
+from google.protobuf.message import DecodeError
 from proto.ssl_simulation_robot_control_pb2 import RobotControl
 
 RECEIVER_FPS = 3000     # Taxa de aquisição da rede dos pacotes do software
+COMMAND_TIMEOUT = 2.0   # Tempo (s) sem comandos até o watchdog zerar as saídas do robô
+CONV_RAD_HZ = 2*np.pi   # Conversão das velocidades para rad/s
+SERIAL_RX_MAX = 4096    # Tamanho máximo (bytes) de uma linha de telemetria incompleta
+RECONEXAO_ESPERA_MIN = 0.1  # Espera (s) entre tentativas de reabrir a serial, dobrada a cada falha
+RECONEXAO_ESPERA_MAX = 2.0  # Espera máxima (s) entre tentativas
+ESCRITA_LENTA = 0.005   # Escrita na serial (s) acima disso conta como travamento
+SHM_CABECALHO = 64      # Bytes no início de cada bloco compartilhado reservados ao contador do seqlock
+QUADRO_LIMITE = 2**31 - 1   # Maior módulo de um valor do quadro (int32, sem o -2**31 do cast inválido)
+
+# Quadro binário de telemetria do STM:
+#   sincronismo (0xA5 0x5A) | tamanho do payload (u8) | payload | CRC-16/CCITT-FALSE (u16, LE)
+#   payload: blocos de 23 bytes (id u8, sequência ecoada u16, 4 velocidades f32, latência f32),
+#   little-endian
+#   O CRC cobre o byte de tamanho e o payload.
+TELEMETRIA_SYNC = b'\xA5\x5A'
+TELEMETRIA_BLOCO = struct.Struct('<BH5f')
+TELEMETRIA_CRC = struct.Struct('<H')
+TELEMETRIA_CABECALHO = len(TELEMETRIA_SYNC) + 1
+
+# Quadro de comando enviado ao STM (modo enquadrado):
+#   sincronismo (0x5A 0xA5) | sequência (u16) | valores (int32 cada) | CRC-16/CCITT-FALSE (u16)
+#   Tudo little-endian; o CRC cobre a sequência e os valores.
+COMANDO_SYNC = b'\x5A\xA5'
+COMANDO_CRC = struct.Struct('<H')
+
+# Medição do tempo de ida e volta (RTT) pela sequência ecoada na telemetria
+RTT_JANELA_SEQ = 1024       # Envios guardados para casar com o eco (~17 s a 60 Hz)
+RTT_BORDAS = np.geomspace(1e-5, 1.0, 201)   # Bordas (s) do histograma, de 10 us a 1 s
+
+# Colunas do estado de cada robô em RobotStateStore
+FRONT_RIGHT, BACK_RIGHT, BACK_LEFT, FRONT_LEFT, KICK, LAST_SEEN = range(6)
+N_STATE_COLUMNS = 6
+
+# Ordem das rodas no quadro do STM. Padrão software: (1,2,3,4); padrão eletrônica: (4,3,2,1)
+RODAS_ELETRONICA = (FRONT_LEFT, BACK_LEFT, BACK_RIGHT, FRONT_RIGHT)
+
+# Colunas do histórico de telemetria de cada robô em HistoricoTelemetria
+TEL_TEMPO, TEL_V1, TEL_V2, TEL_V3, TEL_V4, TEL_LATENCIA = range(6)
+N_TELEMETRIA_COLUNAS = 6
+TELEMETRIA_HISTORICO = 1024     # Amostras guardadas por robô
 
 # ---------------------------------------------------------------------------------------------
 #    DEFINIÇÃO DAS CLASSES DE COMUNICAÇÃO SOCKET E SERIAL
@@ -19,49 +68,344 @@ class RepeatTimer(threading.Timer):
         while not self.finished.wait(self.interval):
             self.function(*self.args, **self.kwargs)
 
+class WheelVelocityDecoder:
+    """
+    Descrição:
+        Decodificador rápido de pacotes RobotControl no formato mais comum, em que cada
+        RobotCommand traz um MoveWheelVelocity. Lê os campos diretamente do buffer 
+        (wire format do Protobuf) e escreve em listas pré-alocadas, sem criar objetos 
+        de mensagem. Qualquer pacote fora desse formato é recusado (retorno -1) para que
+        o chamador use o parser gerado em ssl_simulation_robot_control_pb2.
+    Entradas:
+        max_commands:   Quantidade máxima de RobotCommand por pacote no caminho rápido
+    """
+    # Tags (número do campo << 3 | tipo) usadas no ssl_simulation_robot_control.proto
+    TAG_ROBOT_COMMANDS = 0x0A       # RobotControl.robot_commands, LEN
+    TAG_ID = 0x08                   # RobotCommand.id, VARINT
+    TAG_MOVE_COMMAND = 0x12         # RobotCommand.move_command, LEN
+    TAG_KICK_SPEED = 0x1D           # RobotCommand.kick_speed, I32
+    TAG_KICK_ANGLE = 0x25           # RobotCommand.kick_angle, I32 (ignorado)
+    TAG_DRIBBLER_SPEED = 0x2D       # RobotCommand.dribbler_speed, I32 (ignorado)
+    TAG_WHEEL_VELOCITY = 0x0A       # RobotMoveCommand.wheel_velocity, LEN
+    # MoveWheelVelocity: front_right, back_right, back_left, front_left (I32)
+    WHEEL_TAGS = {0x0D: 1, 0x15: 2, 0x1D: 3, 0x25: 4}
+
+    _FLOAT = struct.Struct('<f')
+
+    def __init__(self, max_commands: int = 16):
+        self.max_commands = max_commands
+        # Cada linha: [id, frente direita, trás direita, trás esquerda, frente esquerda, chute]
+        self.commands = [[0, 0.0, 0.0, 0.0, 0.0, 0.0] for _ in range(max_commands)]
+
+    @staticmethod
+    def _varint(buf, pos, end):
+        """Lê um varint a partir de pos. Retorna (valor, nova posição) ou (-1, pos) se inválido."""
+        result = 0
+        shift = 0
+        while pos < end and shift < 64:
+            byte = buf[pos]
+            pos += 1
+            result |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return result, pos
+            shift += 7
+        return -1, pos
+
+    def decode(self, buf, nbytes):
+        """
+        Descrição:
+            Decodifica os nbytes iniciais de buf (bytes, bytearray ou memoryview).
+        Retorna:
+            Número de comandos escritos em self.commands ou -1 se o pacote precisar do 
+            parser completo.
+        """
+        unpack_float = self._FLOAT.unpack_from
+        wheel_tags = self.WHEEL_TAGS
+        count = 0
+        pos = 0
+
+        while pos < nbytes:
+            if buf[pos] != self.TAG_ROBOT_COMMANDS or count >= self.max_commands:
+                return -1
+            length, pos = self._varint(buf, pos + 1, nbytes)
+            end = pos + length
+            if length < 0 or end > nbytes:
+                return -1
+
+            command = self.commands[count]
+            command[1] = command[2] = command[3] = command[4] = command[5] = 0.0
+            has_id = False
+            has_move = False
+
+            while pos < end:
+                tag = buf[pos]
+                pos += 1
+                if tag == self.TAG_ID:
+                    command[0], pos = self._varint(buf, pos, end)
+                    if command[0] < 0:
+                        return -1
+                    has_id = True
+                elif tag == self.TAG_KICK_SPEED and pos + 4 <= end:
+                    command[5] = unpack_float(buf, pos)[0]
+                    pos += 4
+                elif (tag == self.TAG_KICK_ANGLE or tag == self.TAG_DRIBBLER_SPEED) and pos + 4 <= end:
+                    pos += 4
+                elif tag == self.TAG_MOVE_COMMAND and not has_move:
+                    has_move = True
+                    move_length, pos = self._varint(buf, pos, end)
+                    move_end = pos + move_length
+                    if move_length < 0 or move_end > end:
+                        return -1
+                    if move_length == 0:
+                        continue
+                    if buf[pos] != self.TAG_WHEEL_VELOCITY:
+                        # local_velocity ou global_velocity
+                        return -1
+                    wheel_length, pos = self._varint(buf, pos + 1, move_end)
+                    if wheel_length < 0 or pos + wheel_length != move_end:
+                        return -1
+                    seen = 0
+                    while pos < move_end:
+                        index = wheel_tags.get(buf[pos])
+                        if index is None or pos + 5 > move_end:
+                            return -1
+                        command[index] = unpack_float(buf, pos + 1)[0]
+                        seen |= 1 << index
+                        pos += 5
+                    if seen != 0b11110:
+                        # Campos obrigatórios ausentes: o parser completo acusa o erro
+                        return -1
+                else:
+                    return -1
+
+            if not has_id:
+                return -1
+            count += 1
+
+        return count
+
+class RobotStateStore:
+    """
+    Descrição:
+        Estado do time em um único array NumPy contíguo (n_robots x 6), com as colunas
+        FRONT_RIGHT, BACK_RIGHT, BACK_LEFT, FRONT_LEFT, KICK e LAST_SEEN (instante monotônico
+        do último comando). O array é float64 para que LAST_SEEN não perca resolução.
+
+        O array é protegido por um seqlock, para que a thread de recepção publique comandos
+        inteiros e o laço de controle leia um retrato consistente de todos os robôs sem travas
+        por campo. Há um único escritor (a thread de recepção): o contador de sequência fica
+        ímpar durante a escrita e o leitor repete a cópia se a sequência mudou ou estava ímpar.
+    Entradas:
+        n_robots:   Quantidade de robôs armazenados
+    """
+    def __init__(self, n_robots: int):
+        self.n_robots = n_robots
+        self.seq = 0
+        self.data = np.zeros((n_robots, N_STATE_COLUMNS), dtype=np.float64)
+
+    def publish(self, id_robot, front_right, back_right, back_left, front_left, kick_speed):
+        """Publica de uma vez o comando completo de um robô."""
+        self.seq += 1
+        self.data[id_robot] = (front_right, back_right, back_left, front_left, kick_speed, time.monotonic())
+        self.seq += 1
+
+    def publish_many(self, commands):
+        """
+        Descrição:
+            Publica vários comandos dentro da mesma janela de escrita, de modo que o leitor
+            veja a atualização do time inteira ou nenhuma parte dela.
+        Entradas:
+            commands:   Sequência de (id, frente direita, trás direita, trás esquerda, frente esquerda, chute)
+        """
+        now = time.monotonic()
+        data = self.data
+        self.seq += 1
+        for id_robot, front_right, back_right, back_left, front_left, kick_speed in commands:
+            data[id_robot] = (front_right, back_right, back_left, front_left, kick_speed, now)
+        self.seq += 1
+
+    def clear(self, mask):
+        """Zera as rodas e o chute dos robôs selecionados pela máscara booleana."""
+        self.seq += 1
+        self.data[mask, :LAST_SEEN] = 0.0
+        self.seq += 1
+
+    def snapshot(self):
+        """
+        Descrição:
+            Copia o estado de todos os robôs.
+        Retorna:
+            Array (n_robots x 6) com as colunas FRONT_RIGHT ... LAST_SEEN. A cópia pertence 
+            ao chamador.
+        """
+        while True:
+            seq = self.seq
+            if not seq & 1:
+                data = self.data.copy()
+                if self.seq == seq:
+                    return data
+            # Escrita em andamento: libera o GIL para o escritor terminar
+            time.sleep(0)
+
+class _BlocoCompartilhado:
+    """
+    Descrição:
+        Array float64 em um bloco multiprocessing.shared_memory, precedido pelo contador de
+        sequência de um seqlock (uint64 em uma linha de cache própria).
+    Entradas:
+        shape:  Formato do array
+        nome:   Nome do bloco a abrir; None cria um bloco novo (nome em self.nome)
+    """
+    def __init__(self, shape, nome=None):
+        tamanho = SHM_CABECALHO + int(np.prod(shape)) * 8
+        criar = nome is None
+        self.shm = shared_memory.SharedMemory(name=nome, create=criar, size=tamanho if criar else 0)
+        self.nome = self.shm.name
+        self.criador = criar
+        self.seq = np.ndarray((1,), dtype=np.uint64, buffer=self.shm.buf)
+        self.dados = np.ndarray(shape, dtype=np.float64, buffer=self.shm.buf, offset=SHM_CABECALHO)
+        if criar:
+            self.seq[0] = 0
+            self.dados[:] = 0.0
+
+    def fechar(self):
+        """Solta o mapeamento; quem criou o bloco também o remove do sistema."""
+        # Os arrays precisam ser soltos antes, senão o buffer continua exportado
+        del self.seq, self.dados
+        self.shm.close()
+        if self.criador:
+            self.shm.unlink()
+
+class SharedRobotStateStore(RobotStateStore):
+    """
+    Descrição:
+        RobotStateStore com o array e o contador do seqlock em memória compartilhada, para o
+        Receiver publicar em um processo e o laço de controle ler em outro. O protocolo é o
+        mesmo (um único escritor, leitor repete a cópia), agora entre processos: vale para
+        arquiteturas que não reordenam escritas entre si nem leituras entre si (x86).
+    Entradas:
+        n_robots:   Quantidade de robôs armazenados
+        name:       Nome do bloco criado por outro processo (SharedRobotStateStore.name);
+                    None cria um bloco novo
+    """
+    def __init__(self, n_robots: int, name: str = None):
+        self.n_robots = n_robots
+        self._block = _BlocoCompartilhado((n_robots, N_STATE_COLUMNS), name)
+        self._seq = self._block.seq
+        self.data = self._block.dados
+
+    @property
+    def seq(self):
+        return int(self._seq[0])
+
+    @seq.setter
+    def seq(self, value):
+        self._seq[0] = value
+
+    @property
+    def name(self):
+        return self._block.nome
+
+    def close(self):
+        del self._seq, self.data
+        self._block.fechar()
+
 class RobotVelocity:
     """
     Descrição:
-        Classe para armazenar as velocidades de cada robô
+        Visão somente leitura de um robô do RobotStateStore, mantida para o código que acessa 
+        as velocidades por atributos. Cada leitura vai direto ao array, sem seqlock; para 
+        montar quadros use RobotStateStore.snapshot.
     Entradas:
-        id_robot:   Robô que corresponde às velocidades do objeto (0 a 2)
+        id_robot:   Robô que corresponde às velocidades do objeto
+        state:      RobotStateStore do time
     """
-    def __init__(self, id_robot):
+    def __init__(self, id_robot, state):
         self.id_robot = id_robot  # id do robô
-        # Velocidades angulares
-        self.wheel_velocity_front_right = 0 
-        self.wheel_velocity_back_right = 0
-        self.wheel_velocity_back_left = 0
-        self.wheel_velocity_front_left = 0
-        self.kick_speed = 0
+        self._state = state
+
+    @property
+    def wheel_velocity_front_right(self):
+        return self._state.data[self.id_robot, FRONT_RIGHT]
+
+    @property
+    def wheel_velocity_back_right(self):
+        return self._state.data[self.id_robot, BACK_RIGHT]
+
+    @property
+    def wheel_velocity_back_left(self):
+        return self._state.data[self.id_robot, BACK_LEFT]
 
-        self.cont_not_message = 0
-        self.treshold_message = 2*RECEIVER_FPS
+    @property
+    def wheel_velocity_front_left(self):
+        return self._state.data[self.id_robot, FRONT_LEFT]
+
+    @property
+    def kick_speed(self):
+        return self._state.data[self.id_robot, KICK]
 
 class Receiver():
-    def __init__(self, ip: str = 'localhost', port: int = 10330, logger: bool = False):
+    def __init__(self, ip: str = 'localhost', port: int = 10330, logger: bool = False,
+                 fast_decoder: bool = True, n_robots: int = 3, command_timeout: float = COMMAND_TIMEOUT,
+                 state: RobotStateStore = None):
         """
         Descrição:
             Classe para recepção de mensagens serializadas usando Google Protobuf.
         
         Entradas:
-            ip:       Endereço IP para escuta. Padrão é 'localhost'.
-            port:     Porta de escuta. Padrão é 10302.
-            logger:   Flag que ativa o log de recebimento de mensagens no terminal.
+            ip:             Endereço IP para escuta. Padrão é 'localhost'.
+            port:           Porta de escuta. Padrão é 10302.
+            logger:         Flag que ativa o log de recebimento de mensagens no terminal.
+            fast_decoder:   Usa o WheelVelocityDecoder antes do parser do Protobuf.
+            n_robots:       Quantidade de robôs controlados (ids 0 a n_robots-1).
+            command_timeout: Prazo (s) sem comandos até o watchdog zerar as saídas de um robô.
+            state:          RobotStateStore a usar (ex.: SharedRobotStateStore); None cria um novo.
         """
         # Parâmetros de rede
         self.ip = ip
         self.port = port
         self.buffer_size = 65536  # Tamanho máximo do buffer para receber mensagens
 
+        # Buffer pré-alocado usado pela recepção em lote
+        self._buffer = bytearray(self.buffer_size)
+        self._buffer_view = memoryview(self._buffer)
+        self._pending = {}
+
+        # Decodificação
+        self.fast_decoder = WheelVelocityDecoder() if fast_decoder else None
+        self.fast_path_packets = 0
+        self.fallback_packets = 0
+        self.decode_errors = 0
+
+        # Contadores da recepção (datagramas em qualquer modo; lotes e coalescência só com batch)
+        self.datagrams_received = 0
+        self.commands_coalesced = 0
+        self.batches = 0
+        self.wakeups = 0        # Despertares da thread de recepção, em qualquer modo
+
         # Controle de log
         self.logger = logger
 
+        # Modo da thread de recepção ('timer' ou 'event'), definido em start_thread
+        self.mode = None
+
+        # Função chamada com os ids atualizados após cada datagrama (ou lote) publicado,
+        # usada para encaminhar comandos assim que chegam (ver scheduler.AgendadorEventos)
+        self.on_update = None
+
+        # Gravação dos datagramas recebidos (recorder.Gravador), para reproduzir a sessão depois
+        self.recorder = None
+
         # Robôs a serem controlados
-        self.robot0 = RobotVelocity(0)
-        self.robot1 = RobotVelocity(1)
-        self.robot2 = RobotVelocity(2)
-        self.robots = [self.robot0, self.robot1, self.robot2]
+        self.n_robots = n_robots
+        self.state = RobotStateStore(n_robots) if state is None else state
+        self.robots = [RobotVelocity(id_robot, self.state) for id_robot in range(n_robots)]
+
+        # Watchdog: prazo por robô medido no relógio monotônico, independente da taxa de recepção
+        self.command_timeouts = np.full(n_robots, command_timeout, dtype=np.float64)
+        self.watchdog_trips = np.zeros(n_robots, dtype=np.int64)
+        self._active = np.zeros(n_robots, dtype=bool)
+        self._next_deadline = float('inf')
 
         # Criar socket
         self._create_socket()
@@ -79,6 +423,102 @@ class Receiver():
         self.socket.bind((self.ip, self.port))
         self.socket.settimeout(0.1) # Timeout para não bloquear indefinidamente
 
+    def _create_selector(self):
+        """
+        Descrição:
+            Cria o seletor do modo por eventos. Além do socket UDP, registra um par de 
+            sockets interno usado apenas para acordar a espera no momento da parada.
+        """
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._selector.register(self.socket, selectors.EVENT_READ)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+
+    def set_command_timeout(self, id_robot, timeout):
+        """
+        Descrição:
+            Altera o prazo do watchdog de um robô.
+        Entradas:
+            id_robot:   Robô a configurar
+            timeout:    Tempo (s) sem comandos até zerar as saídas do robô
+        """
+        self.command_timeouts[id_robot] = timeout
+        # Recalcula o próximo prazo na próxima verificação; no modo por eventos o seletor pode
+        # estar bloqueado até o prazo antigo, então é preciso acordá-lo
+        self._next_deadline = 0.0
+        if self.mode == 'event':
+            try:
+                self._wakeup_w.send(b'\0')
+            except OSError:
+                pass        # Parada em andamento: o socket de despertar já foi fechado
+
+    def _arm_watchdog(self, id_robot):
+        """Arma o watchdog de um robô que voltou a receber comandos."""
+        if not self._active[id_robot]:
+            self._active[id_robot] = True
+            deadline = self.state.data[id_robot, LAST_SEEN] + self.command_timeouts[id_robot]
+            if deadline < self._next_deadline:
+                self._next_deadline = deadline
+
+    def _check_watchdog(self):
+        """
+        Descrição:
+            Zera rodas e chute dos robôs cujo último comando passou do prazo. Enquanto o 
+            próximo prazo não vence, a verificação é uma única comparação; quando vence, os
+            prazos de todos os robôs são avaliados de uma vez com NumPy.
+        """
+        now = time.monotonic()
+        if now < self._next_deadline:
+            return
+
+        deadlines = self.state.data[:, LAST_SEEN] + self.command_timeouts
+        expired = self._active & (deadlines <= now)
+        if expired.any():
+            self.state.clear(expired)
+            self._active[expired] = False
+            self.watchdog_trips[expired] += 1
+            if self.logger:
+                print(f"[Receiver] Watchdog zerou os robôs {np.flatnonzero(expired).tolist()}")
+
+        self._next_deadline = deadlines[self._active].min() if self._active.any() else float('inf')
+
+    def _receive_loop(self):
+        """
+        Descrição:
+            Laço do modo por eventos. A thread fica bloqueada no seletor (epoll no Linux)
+            e só acorda quando chega um datagrama, quando a parada é solicitada ou quando
+            vence o prazo do watchdog de algum robô.
+        """
+        while not self._stop_event.is_set():
+            timeout = None
+            if self._next_deadline != float('inf'):
+                timeout = max(0.0, self._next_deadline - time.monotonic())
+
+            eventos = self._selector.select(timeout)
+            self.wakeups += 1
+
+            recebeu = False
+            for key, _ in eventos:
+                if key.fileobj is self._wakeup_r:
+                    try:
+                        self._wakeup_r.recv(64)
+                    except BlockingIOError:
+                        pass
+                else:
+                    self._receive_handler()
+                    recebeu = True
+
+            # receive_socket/receive_batch já verificam o watchdog; aqui só nos despertares
+            # pelo prazo (ou pela parada)
+            if not recebeu:
+                self._check_watchdog()
+
+    def _timer_tick(self):
+        """Despertar do modo 'timer': uma leitura do socket a cada período do RepeatTimer."""
+        self.wakeups += 1
+        self._receive_handler()
+
     def receive_socket(self):
         """
         Descrição:
@@ -88,132 +528,1075 @@ class Receiver():
             Instância da classe Protobuf desserializada ou None se não receber nada.
         """
         try:
-            data, _ = self.socket.recvfrom(self.buffer_size)
+            nbytes = self.socket.recv_into(self._buffer, self.buffer_size)
+            self.datagrams_received += 1
             if self.logger:
                 print("[Receiver] Mensagem recebida")
 
-            # Desserializar a mensagem usando a classe Protobuf RobotControl
-            message = RobotControl()
-            message.ParseFromString(data)
-            self.decode_message(message)
+            commands, count = self._decode_datagram(nbytes)
+            self._apply_commands(commands, count)
+            self._notify_update(commands, count)
 
+        except socket.timeout:
+            # Nenhuma mensagem disponível no momento
+            pass
         except socket.error as e:
-            if e.errno == socket.errno.EAGAIN:
-                # Nenhuma mensagem disponível no momento
-                # Se ficar muito tempo sem receber mensagens, a velocidade do robô vai a zero
-                for robot in self.robots:
-                    if robot.cont_not_message > robot.treshold_message:
-                        robot.wheel_velocity_front_right = 0
-                        robot.wheel_velocity_back_right = 0
-                        robot.wheel_velocity_back_left = 0
-                        robot.wheel_velocity_front_left = 0
-                    else:
-                        robot.cont_not_message += 1
-                
-                return None
-            else:
+            if e.errno != socket.errno.EAGAIN:
                 print("[Receiver] Erro de socket:", e)
-                return None
-            
+
+        # Se ficar muito tempo sem receber mensagens, as saídas do robô vão a zero
+        self._check_watchdog()
+        return None
+
+    def process_datagram(self, data):
+        """
+        Descrição:
+            Decodifica e aplica um datagrama recebido por outro meio que não o socket do 
+            Receiver (por exemplo, um DatagramProtocol do asyncio).
+        Entradas:
+            data:   Conteúdo do datagrama (bytes)
+        """
+        nbytes = len(data)
+        self._buffer[:nbytes] = data
+        self.datagrams_received += 1
+        commands, count = self._decode_datagram(nbytes)
+        self._apply_commands(commands, count)
+        self._notify_update(commands, count)
+
+    def _notify_update(self, commands, count):
+        """Repassa a on_update os ids de robô válidos entre os count primeiros comandos."""
+        if self.on_update is None or count == 0:
+            return
+        ids = [commands[i][0] for i in range(count) if commands[i][0] < self.n_robots]
+        if ids:
+            self.on_update(ids)
+
+    def _decode_datagram(self, nbytes):
+        """
+        Descrição:
+            Decodifica o datagrama de nbytes presente no buffer de recepção. Tenta primeiro o
+            caminho rápido e, se o pacote não estiver no formato esperado, desserializa com a 
+            classe Protobuf RobotControl.
+        Retorna:
+            Tupla (comandos, quantidade). Os comandos do caminho rápido são listas reutilizadas,
+            válidas apenas até o próximo datagrama.
+        """
+        if self.recorder is not None:
+            self.recorder.datagrama(self._buffer_view[:nbytes])
+        if self.fast_decoder is not None:
+            count = self.fast_decoder.decode(self._buffer_view, nbytes)
+            if count >= 0:
+                self.fast_path_packets += 1
+                return self.fast_decoder.commands, count
+
+        self.fallback_packets += 1
+        message = RobotControl()
+        try:
+            message.ParseFromString(bytes(self._buffer_view[:nbytes]))
+        except DecodeError as e:
+            self.decode_errors += 1
+            print("[Receiver] Mensagem inválida:", e)
+            return (), 0
+        commands = [self._read_command(robot_command) for robot_command in message.robot_commands]
+        return commands, len(commands)
+
+    def _recv_nowait(self):
+        """
+        Descrição:
+            Lê um datagrama pendente para o buffer pré-alocado sem bloquear. O socket precisa
+            estar sem timeout (receive_batch cuida disso): com timeout, o Python espera o socket
+            ficar legível antes do recv, mesmo com MSG_DONTWAIT, e o lote só terminaria depois
+            de 0.1 s sem datagramas.
+        Retorna:
+            Número de bytes lidos ou None se a fila do kernel estiver vazia.
+        """
+        try:
+            return self.socket.recv_into(self._buffer, self.buffer_size)
+        except (BlockingIOError, socket.timeout):
+            return None
+
+    def receive_batch(self):
+        """
+        Descrição:
+            Esvazia de uma só vez todos os datagramas pendentes no socket, mantendo apenas o 
+            comando mais recente de cada robô. Os comandos descartados por terem sido 
+            substituídos no mesmo lote são contados em commands_coalesced.
+        
+        Retorna:
+            Número de datagramas lidos no lote.
+        """
+        pending = self._pending
+        pending.clear()
+        received = 0
+
+        timeout = self.socket.gettimeout()
+        self.socket.settimeout(0.0)
+        try:
+            while True:
+                try:
+                    nbytes = self._recv_nowait()
+                except socket.error as e:
+                    print("[Receiver] Erro de socket:", e)
+                    break
+                if nbytes is None:
+                    break
+                received += 1
+
+                commands, count = self._decode_datagram(nbytes)
+                for i in range(count):
+                    command = commands[i]
+                    if command[0] in pending:
+                        self.commands_coalesced += 1
+                    pending[command[0]] = tuple(command)
+        finally:
+            self.socket.settimeout(timeout)
+
+        if received > 0:
+            if self.logger:
+                print(f"[Receiver] Lote com {received} mensagens")
+
+            # Publica a atualização do lote inteiro de uma só vez
+            commands = [command for command in pending.values() if self._valid_robot(command[0])]
+            self.state.publish_many(commands)
+            for command in commands:
+                self._arm_watchdog(command[0])
+            self._notify_update(commands, len(commands))
+
+            self.datagrams_received += received
+            self.batches += 1
+
+        self._check_watchdog()
+        return received
+
+    def get_stats(self):
+        """Retorna os contadores da recepção em lote e da decodificação."""
+        return {
+            'datagrams_received': self.datagrams_received,
+            'commands_coalesced': self.commands_coalesced,
+            'batches': self.batches,
+            'fast_path_packets': self.fast_path_packets,
+            'fallback_packets': self.fallback_packets,
+            'decode_errors': self.decode_errors,
+            'wakeups': self.wakeups,
+        }
+
+    def _read_command(self, command):
+        """
+        Descrição:
+            Extrai os campos de um RobotCommand.
+        Retorna:
+            Tupla (id, frente direita, trás direita, trás esquerda, frente esquerda, chute).
+        """
+        wheel_velocity = command.move_command.wheel_velocity
+        return (command.id,
+                wheel_velocity.front_right,
+                wheel_velocity.back_right,
+                wheel_velocity.back_left,
+                wheel_velocity.front_left,
+                command.kick_speed)
+
+    def _valid_robot(self, id_robot):
+        """Verifica se o id recebido corresponde a um dos robôs controlados."""
+        if id_robot >= self.n_robots:
+            if self.logger:
+                print(f"[Receiver] Comando para robô desconhecido: {id_robot}")
+            return False
+        return True
+
+    def _apply_commands(self, commands, count):
+        """
+        Descrição:
+            Publica os comandos válidos de um datagrama com um único publish_many, para o laço
+            de controle nunca ver só parte de uma mensagem do time.
+        Entradas:
+            commands:   Comandos decodificados (ver _decode_datagram)
+            count:      Quantidade de comandos válidos em commands
+        """
+        valid = [commands[i] for i in range(count) if self._valid_robot(commands[i][0])]
+        if not valid:
+            return
+        self.state.publish_many(valid)
+        for command in valid:
+            self._arm_watchdog(command[0])
+
     def decode_message(self, message):
-        id_robot = message.robot_commands[0].id
-        wheel_velocity_front_right = message.robot_commands[0].move_command.wheel_velocity.front_right
-        wheel_velocity_back_right = message.robot_commands[0].move_command.wheel_velocity.back_right
-        wheel_velocity_back_left = message.robot_commands[0].move_command.wheel_velocity.back_left
-        wheel_velocity_front_left = message.robot_commands[0].move_command.wheel_velocity.front_left
-        kick_speed = message.robot_commands[0].kick_speed
-        self.robots[id_robot].wheel_velocity_front_right = wheel_velocity_front_right
-        self.robots[id_robot].wheel_velocity_back_right = wheel_velocity_back_right
-        self.robots[id_robot].wheel_velocity_back_left = wheel_velocity_back_left
-        self.robots[id_robot].wheel_velocity_front_left = wheel_velocity_front_left
-        self.robots[id_robot].cont_not_message = 0
-        self.robots[id_robot].kick_speed = kick_speed
+        """Aplica todos os comandos de robô contidos em uma mensagem RobotControl."""
+        commands = [self._read_command(robot_command) for robot_command in message.robot_commands]
+        self._apply_commands(commands, len(commands))
 
             
-    def start_thread(self):
+    def start_thread(self, mode: str = 'timer', batch: bool = False):
         """
         Descrição:
             Função que inicia a thread da visão
+        Entradas:
+            mode:   'timer' para o laço periódico em RECEIVER_FPS (comportamento original) ou
+                    'event' para acordar apenas quando houver datagrama no socket.
+            batch:  Se True, cada despertar esvazia a fila do socket com receive_batch em vez 
+                    de ler um único datagrama.
         """
-        self.vision_thread = RepeatTimer((1 / RECEIVER_FPS), self.receive_socket)
+        self._receive_handler = self.receive_batch if batch else self.receive_socket
+        if mode == 'timer':
+            self.vision_thread = RepeatTimer((1 / RECEIVER_FPS), self._timer_tick)
+        elif mode == 'event':
+            self._stop_event = threading.Event()
+            self._create_selector()
+            self.vision_thread = threading.Thread(target=self._receive_loop, daemon=True)
+        else:
+            raise ValueError(f"Modo de recepção desconhecido: '{mode}'")
+        self.mode = mode
         self.vision_thread.start()
+
+    def stop_thread(self):
+        """
+        Descrição:
+            Encerra a thread de recepção, em qualquer um dos modos, e aguarda o seu término.
+        """
+        if self.mode is None:
+            return
+
+        if self.mode == 'timer':
+            self.vision_thread.cancel()
+        else:
+            self._stop_event.set()
+            self._wakeup_w.send(b'\0')
+        self.vision_thread.join()
+
+        if self.mode == 'event':
+            self._selector.close()
+            self._wakeup_r.close()
+            self._wakeup_w.close()
+        self.mode = None
         
+class MontadorQuadro:
+    """
+    Descrição:
+        Monta os inteiros enviados ao STM a partir de um retrato do estado do time, guiado por
+        uma tabela de mapeamento em vez de uma expressão por roda. Por robô do quadro são 5
+        valores: as 4 rodas na ordem da eletrônica, multiplicadas por sinal, escala e
+        inverter e truncadas para int32, e o bit do chute (1 se o chute estiver ativo).
+        Um robô com algum valor não finito (NaN, inf) vai zerado no quadro e é contado em
+        robos_invalidos; velocidades fora do int32 são saturadas em ±QUADRO_LIMITE.
+        Velocidades das rodas  (1,2,3,4) dos robos (1,2,3) (Roda 1 robo1, Roda 2 robo 1, Roda 3 Robo 1 ... )
+        Padrão software: (1,2,3,4)
+        Padrão Eletrônica: (4,3,2,1)
+        Robô 2 é o atacante no software, mas Robô 0 para eletrônica
+    Entradas:
+        robos:      Ids (do software) dos robôs na ordem em que entram no quadro
+        rodas:      Colunas do estado (FRONT_RIGHT ...) na ordem em que entram no quadro
+        sinais:     Sinal de cada roda do quadro (1 ou -1), para motores montados invertidos
+        escala:     Fator da velocidade para o inteiro enviado; um valor ou um por roda
+        inverter:   -1 para inverter o sentido dos motores, 1 caso contrário
+    """
+    def __init__(self, robos=(2, 1, 0), rodas=RODAS_ELETRONICA, sinais=(1, 1, 1, 1), escala=CONV_RAD_HZ,
+                 inverter=-1):
+        self.robos = tuple(robos)
+        self._linhas = np.array(self.robos, dtype=np.intp)[:, None]
+        self._colunas = np.array(tuple(rodas) + (KICK,), dtype=np.intp)
+
+        # Ganho por coluna do quadro; o chute passa sem ganho e vira bit depois
+        self._ganho = np.ones(5, dtype=np.float64)
+        self._ganho[:4] = np.asarray(sinais, dtype=np.float64) * escala * inverter
+
+        self._escalado = np.zeros((len(self.robos), 5), dtype=np.float64)
+        self._inteiros = np.zeros((len(self.robos), 5), dtype='<i4')
+        self.quadro = self._inteiros.reshape(-1)    # Visão achatada, reutilizada a cada montagem
+        self.robos_invalidos = 0    # Robôs zerados por valores não finitos (somados a cada montagem)
+
+    @property
+    def n_valores(self):
+        return self.quadro.size
+
+    def montar(self, estado):
+        """
+        Entradas:
+            estado:     Array retornado por RobotStateStore.snapshot
+        Retorna:
+            Array int32 com 5 valores por robô (self.quadro), sobrescrito na próxima chamada.
+        """
+        escalado = self._escalado
+        np.multiply(estado[self._linhas, self._colunas], self._ganho, out=escalado)
+        validos = np.isfinite(escalado).all(axis=1)
+        if not validos.all():
+            # O cast de NaN/inf daria -2**31, um comando de fundo de escala para o motor
+            escalado[~validos] = 0.0
+            self.robos_invalidos += int(np.count_nonzero(~validos))
+        escalado[:, 4] = escalado[:, 4] != 0
+        np.clip(escalado, -QUADRO_LIMITE, QUADRO_LIMITE, out=escalado)
+        np.copyto(self._inteiros, escalado, casting='unsafe')   # Trunca em direção ao zero, como int()
+        return self.quadro
+
+def crc16(dados, crc=0xFFFF):
+    """Calcula o CRC-16/CCITT-FALSE (polinômio 0x1021, valor inicial 0xFFFF)."""
+    return binascii.crc_hqx(dados, crc)
+
+def montar_quadro_telemetria(blocos):
+    """
+    Descrição:
+        Monta um quadro binário de telemetria, no formato enviado pelo STM.
+    Entradas:
+        blocos:     Sequência de (id, sequência ecoada, v1, v2, v3, v4, latência)
+    Retorna:
+        Quadro completo (bytes), com sincronismo, tamanho e CRC.
+    """
+    payload = b''.join(TELEMETRIA_BLOCO.pack(*bloco) for bloco in blocos)
+    corpo = bytes([len(payload)]) + payload
+    return TELEMETRIA_SYNC + corpo + TELEMETRIA_CRC.pack(crc16(corpo))
+
+class CodificadorComando:
+    """
+    Descrição:
+        Codifica os valores enviados ao STM em um buffer reutilizado. Os inteiros são copiados
+        de uma vez para uma visão int32 little-endian do buffer e o cabeçalho é escrito com um
+        struct.Struct pré-compilado. No modo enquadrado o quadro recebe sincronismo, número
+        de sequência e CRC, permitindo ao firmware descartar quadros corrompidos e se
+        realinhar após a perda de um byte. Sem enquadramento, gera os 60 bytes crus de antes.
+    Entradas:
+        n_valores:  Quantidade de inteiros por quadro (15 para 3 robôs)
+        enquadrado: Adiciona sincronismo, sequência e CRC ao quadro
+    """
+    def __init__(self, n_valores: int = 15, enquadrado: bool = True):
+        self.n_valores = n_valores
+        self.enquadrado = enquadrado
+        self.seq = 0        # Sequência do último quadro codificado
+
+        if enquadrado:
+            self._cabecalho = struct.Struct(f'<{len(COMANDO_SYNC)}sH')
+            inicio = self._cabecalho.size
+            self._fim_corpo = inicio + 4 * n_valores
+            self.tamanho = self._fim_corpo + COMANDO_CRC.size
+        else:
+            inicio = 0
+            self.tamanho = 4 * n_valores
+
+        self._buffer = bytearray(self.tamanho)
+        self._view = memoryview(self._buffer)
+        self._valores = np.frombuffer(self._buffer, dtype='<i4', count=n_valores, offset=inicio)
+
+    def codificar(self, valores):
+        """
+        Descrição:
+            Escreve os valores no buffer do codificador.
+        Entradas:
+            valores:    Array (MontadorQuadro.montar) ou sequência com n_valores inteiros
+        Retorna:
+            memoryview do quadro pronto, válida até a próxima chamada.
+        """
+        self._valores[:] = valores
+        if not self.enquadrado:
+            return self._view
+
+        self.seq = (self.seq + 1) & 0xFFFF
+        self._cabecalho.pack_into(self._buffer, 0, COMANDO_SYNC, self.seq)
+        crc = crc16(self._view[len(COMANDO_SYNC):self._fim_corpo])
+        COMANDO_CRC.pack_into(self._buffer, self._fim_corpo, crc)
+        return self._view
+
+class HistogramaLatencia:
+    """
+    Descrição:
+        Histograma de latências com bordas fixas (RTT_BORDAS, espaçadas em escala log).
+        Registrar não aloca; os percentis são aproximados pela borda superior da faixa,
+        com erro relativo de ~5%. O máximo é exato.
+    """
+    def __init__(self, bordas=RTT_BORDAS):
+        self.bordas = bordas
+        self.contagens = np.zeros(len(bordas) + 1, dtype=np.int64)  # +1: abaixo e acima das bordas
+        self.amostras = 0
+        self.maximo = 0.0
+
+    def registrar(self, valor):
+        self.contagens[np.searchsorted(self.bordas, valor)] += 1
+        self.amostras += 1
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def percentil(self, p):
+        """Retorna o percentil p (0-100) em segundos, ou 0.0 sem amostras."""
+        if self.amostras == 0:
+            return 0.0
+        faixa = int(np.searchsorted(np.cumsum(self.contagens), p / 100 * self.amostras))
+        if faixa >= len(self.bordas):
+            return self.maximo
+        return float(min(self.bordas[faixa], self.maximo))
+
+    def resumo(self):
+        return {
+            'amostras': self.amostras,
+            'p50': self.percentil(50),
+            'p99': self.percentil(99),
+            'max': float(self.maximo),
+        }
+
+class HistoricoTelemetria:
+    """
+    Descrição:
+        Buffer circular pré-alocado com a telemetria de um robô: uma linha por amostra com
+        as colunas TEL_TEMPO ... TEL_LATENCIA. Registrar só escreve no array; as consultas
+        são vetorizadas e devolvem cópias em ordem cronológica.
+        Há um único escritor (a leitura da serial). Uma consulta concorrente pode ver a
+        amostra mais antiga ser sobrescrita, mas nunca lê uma linha além de self.total.
+    Entradas:
+        capacidade: Número de amostras guardadas
+    """
+    def __init__(self, capacidade: int = TELEMETRIA_HISTORICO):
+        self.capacidade = capacidade
+        self.dados = np.zeros((capacidade, N_TELEMETRIA_COLUNAS), dtype=np.float64)
+        self.total = 0      # Amostras registradas desde a criação
+
+    def __len__(self):
+        return min(self.total, self.capacidade)
+
+    def registrar(self, tempo, v1, v2, v3, v4, latencia):
+        dados = self.dados
+        i = self.total % self.capacidade
+        dados[i, TEL_TEMPO] = tempo
+        dados[i, TEL_V1] = v1
+        dados[i, TEL_V2] = v2
+        dados[i, TEL_V3] = v3
+        dados[i, TEL_V4] = v4
+        dados[i, TEL_LATENCIA] = latencia
+        # Publica a linha só depois de escrita
+        self.total += 1
+
+    def ultima(self):
+        """Retorna a amostra mais recente (cópia) ou None se ainda não houver nenhuma."""
+        total = self.total
+        if total == 0:
+            return None
+        return self.dados[(total - 1) % self.capacidade].copy()
+
+    def ultimas(self, n=None):
+        """
+        Entradas:
+            n:  Quantidade de amostras (None para todas as guardadas)
+        Retorna:
+            Array (k x N_TELEMETRIA_COLUNAS) com as k <= n amostras mais recentes, da mais
+            antiga para a mais nova.
+        """
+        total = self.total
+        k = min(total, self.capacidade) if n is None else min(n, total, self.capacidade)
+        return self.dados[np.arange(total - k, total) % self.capacidade]
+
+    def desde(self, tempo):
+        """Retorna as amostras com TEL_TEMPO >= tempo (time.time()), em ordem cronológica."""
+        amostras = self.ultimas()
+        return amostras[amostras[:, TEL_TEMPO] >= tempo]
+
+    def media_velocidades(self, janela=0.2, agora=None):
+        """
+        Descrição:
+            Média de cada roda nas amostras dos últimos `janela` segundos.
+        Retorna:
+            Array com 4 médias (v1 ... v4); NaN se não houver amostras na janela.
+        """
+        if agora is None:
+            agora = time.time()
+        amostras = self.desde(agora - janela)
+        if len(amostras) == 0:
+            return np.full(4, np.nan)
+        return amostras[:, TEL_V1:TEL_LATENCIA].mean(axis=0)
+
+class TelemetriaCompartilhada:
+    """
+    Descrição:
+        Última amostra de telemetria de cada robô em memória compartilhada, para o processo da
+        serial publicar e outro processo consultar sem passar pelo GIL do primeiro. Usa o mesmo
+        seqlock do RobotStateStore; como cada transmissor tem a sua thread de leitura, as
+        escritas do processo da serial passam por uma trava local.
+    Entradas:
+        n_robos:    Quantidade de robôs (ids 0 a n_robos-1)
+        nome:       Nome do bloco criado por outro processo; None cria um bloco novo
+    """
+    def __init__(self, n_robos, nome=None):
+        self.n_robos = n_robos
+        # Uma coluna a mais com a quantidade de amostras de cada robô
+        self._bloco = _BlocoCompartilhado((n_robos, N_TELEMETRIA_COLUNAS + 1), nome)
+        self._lock = threading.Lock()
+
+    @property
+    def nome(self):
+        return self._bloco.nome
+
+    def registrar(self, id_robo, tempo, v1, v2, v3, v4, latencia):
+        """Publica uma amostra (compatível com ComunicacaoSerial.ao_telemetria)."""
+        if not 0 <= id_robo < self.n_robos:
+            return
+        bloco = self._bloco
+        with self._lock:
+            bloco.seq[0] += 1
+            linha = bloco.dados[id_robo]
+            linha[:N_TELEMETRIA_COLUNAS] = (tempo, v1, v2, v3, v4, latencia)
+            linha[N_TELEMETRIA_COLUNAS] += 1
+            bloco.seq[0] += 1
+
+    def retrato(self):
+        """Retorna uma cópia consistente da tabela (n_robos x N_TELEMETRIA_COLUNAS + 1)."""
+        bloco = self._bloco
+        while True:
+            seq = int(bloco.seq[0])
+            if not seq & 1:
+                dados = bloco.dados.copy()
+                if int(bloco.seq[0]) == seq:
+                    return dados
+            time.sleep(0)
+
+    def get_dados(self, id_robo):
+        """Retorna a última amostra do robô no formato de ComunicacaoSerial.get_dados, ou None."""
+        linha = self.retrato()[id_robo]
+        if linha[N_TELEMETRIA_COLUNAS] == 0:
+            return None
+        return {
+            'velocidades': linha[TEL_V1:TEL_LATENCIA].tolist(),
+            'latencia': float(linha[TEL_LATENCIA]),
+            'timestamp': float(linha[TEL_TEMPO]),
+        }
+
+    def fechar(self):
+        self._bloco.fechar()
+
+class EscritorSerial:
+    """
+    Descrição:
+        Thread dedicada à escrita na serial. O laço de controle deposita cada quadro em uma
+        caixa de uma única posição e segue sem esperar a porta; se o quadro anterior ainda não
+        foi escrito, ele é substituído (o mais recente vence) em vez de ir para uma fila.
+    Entradas:
+        ser:            Porta serial aberta (serial.Serial)
+        ao_escrever:    Função chamada com a sequência do quadro logo antes de escrevê-lo
+                        (usada no registro de RTT), ou None
+        ao_erro:        Função chamada com a exceção e a porta usada quando a escrita falha, ou None
+        ao_escrito:     Função chamada com o quadro depois de escrito (usada na gravação), ou None
+    """
+    def __init__(self, ser, ao_escrever=None, ao_erro=None, ao_escrito=None):
+        self.ser = ser          # Pode ser trocado pela reconexão
+        self.ao_escrever = ao_escrever
+        self.ao_erro = ao_erro
+        self.ao_escrito = ao_escrito
+
+        self._condicao = threading.Condition()
+        self._quadro = None
+        self._seq = None
+        self.rodando = True
+
+        # Contadores
+        self.quadros_escritos = 0
+        self.quadros_sobrescritos = 0
+        self.erros_escrita = 0
+        self.bytes_escritos = 0
+        self.escritas_lentas = 0    # Escritas que levaram mais de ESCRITA_LENTA
+        self.tempo_escrita_total = 0.0
+        self.tempo_escrita_max = 0.0
+
+        self.thread = threading.Thread(target=self._executar, daemon=True)
+        self.thread.start()
+
+    def publicar(self, dados, seq=None):
+        """
+        Descrição:
+            Deposita um quadro para escrita sem bloquear. O conteúdo é copiado, então o
+            buffer do CodificadorComando pode ser reutilizado logo em seguida.
+        Entradas:
+            dados:  Quadro a enviar (bytes, bytearray ou memoryview)
+            seq:    Sequência do quadro enquadrado, ou None
+        """
+        quadro = bytes(dados)
+        with self._condicao:
+            if self._quadro is not None:
+                self.quadros_sobrescritos += 1
+            self._quadro = quadro
+            self._seq = seq
+            self._condicao.notify()
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                while self._quadro is None and self.rodando:
+                    self._condicao.wait()
+                if not self.rodando:
+                    return
+                quadro, seq = self._quadro, self._seq
+                self._quadro = self._seq = None
+
+            if seq is not None and self.ao_escrever:
+                self.ao_escrever(seq)
+
+            ser = self.ser
+            inicio = time.perf_counter()
+            try:
+                ser.write(quadro)
+            except (serial.SerialException, OSError) as e:
+                self.erros_escrita += 1
+                print(f"ERRO ao enviar dados: {e}")
+                if self.ao_erro:
+                    self.ao_erro(e, ser)
+                continue
+            duracao = time.perf_counter() - inicio
+            if self.ao_escrito:
+                self.ao_escrito(quadro)
+
+            self.quadros_escritos += 1
+            self.bytes_escritos += len(quadro)
+            if duracao > ESCRITA_LENTA:
+                self.escritas_lentas += 1
+            self.tempo_escrita_total += duracao
+            if duracao > self.tempo_escrita_max:
+                self.tempo_escrita_max = duracao
+
+    def get_stats(self):
+        """Retorna os contadores da escrita."""
+        return {
+            'quadros_escritos': self.quadros_escritos,
+            'quadros_sobrescritos': self.quadros_sobrescritos,
+            'erros_escrita': self.erros_escrita,
+            'bytes_escritos': self.bytes_escritos,
+            'escritas_lentas': self.escritas_lentas,
+            'tempo_escrita_medio': self.tempo_escrita_total / self.quadros_escritos if self.quadros_escritos else 0.0,
+            'tempo_escrita_max': self.tempo_escrita_max,
+        }
+
+    def parar(self):
+        """Encerra a thread. Um quadro ainda não escrito é descartado."""
+        with self._condicao:
+            self.rodando = False
+            self._condicao.notify()
+        self.thread.join()
+
+def descobrir_porta(padrao, vid_pid=None):
+    """
+    Descrição:
+        Encontra o dispositivo do transmissor.
+    Entradas:
+        padrao:     Caminho da porta ou padrão glob (ex.: '/dev/ttyACM*'); None aceita qualquer
+                    porta quando vid_pid é dado
+        vid_pid:    (VID, PID) USB do transmissor, ou None para usar só o padrão
+    Retorna:
+        Caminho da primeira porta encontrada (ordem alfabética) ou None.
+    """
+    if vid_pid is not None:
+        vid, pid = vid_pid
+        for porta in sorted(list_ports.comports(), key=lambda p: p.device):
+            if porta.vid == vid and porta.pid == pid and (padrao is None or fnmatch.fnmatch(porta.device, padrao)):
+                return porta.device
+        return None
+
+    if not any(c in padrao for c in '*?['):
+        return padrao
+    candidatas = sorted(glob.glob(padrao))
+    return candidatas[0] if candidatas else None
+
 class ComunicacaoSerial:
-    def __init__(self, porta, baudrate=115200, timeout=1):
+    def __init__(self, porta, baudrate=115200, timeout=0.05, iniciar_leitura=True, telemetria='csv',
+                 capacidade_historico=TELEMETRIA_HISTORICO, escrita_assincrona=True,
+                 reconectar=True, vid_pid=None):
         """
         Descrição:
             Classe para recepção e envio de mensagens para o transmissor via SERIAL.
         
         Entradas:
-            porta
+            porta:              Caminho da porta ou padrão glob (ex.: '/dev/ttyACM*'), procurado 
+                                de novo a cada reconexão
             baudrate
-            timeout
+            timeout:            Tempo máximo (s) que a leitura fica bloqueada sem receber bytes.
+                                Também limita o tempo de resposta de fechar().
+            iniciar_leitura:    Inicia a thread de leitura. Use False quando outro laço (por 
+                                exemplo, o asyncio) ler a porta e chamar _receber_bytes.
+            telemetria:         'csv' para as linhas de texto separadas por vírgula ou 'binaria'
+                                para os quadros com sincronismo e CRC (TELEMETRIA_*). Só a 
+                                binária traz a sequência ecoada usada na medição de RTT.
+            capacidade_historico:   Amostras de telemetria guardadas por robô (HistoricoTelemetria)
+            escrita_assincrona:     Escreve os comandos em uma thread própria (EscritorSerial), 
+                                    sem bloquear quem chama enviar_comando.
+            reconectar:         Quando a porta cai, procura o dispositivo e o reabre em segundo 
+                                plano. Sem a porta na inicialização, começa desconectado em vez 
+                                de lançar a exceção. Enquanto desconectado, os quadros são 
+                                descartados.
+            vid_pid:            (VID, PID) USB do transmissor, para encontrá-lo mesmo que mude 
+                                de nome (ver descobrir_porta)
         """
+        self.porta = porta
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.vid_pid = vid_pid
+        self.reconectar = reconectar
+
+        self.rodando = True
+        self.conectado = threading.Event()
+        self._desconectado = threading.Event()
+        self._parada = threading.Event()
+        self._lock_conexao = threading.Lock()
+
+        # Contadores da conexão
+        self.desconexoes = 0
+        self.reconexoes = 0
+        self.quadros_descartados = 0
+        self.ultima_recuperacao = 0.0
+        self.recuperacao_max = 0.0
+        self._instante_queda = time.monotonic()
+
         self.ser = None
         try:
-            self.ser = serial.Serial(porta, baudrate, timeout=timeout)
-            print(f"Porta serial '{porta}' aberta com sucesso a {baudrate} bps.")
+            self.ser = self._abrir()
+            self.conectado.set()
+            print(f"Porta serial '{self.ser.port}' aberta com sucesso a {baudrate} bps.")
         except serial.SerialException as e:
             print(f"ERRO: Não foi possível abrir a porta serial '{porta}'.")
             print(f"Detalhe do erro: {e}")
             print("Verifique se a porta está correta e não está sendo usada por outro programa.")
-            raise
+            if not reconectar:
+                raise
+            print("Aguardando o transmissor ser conectado...")
+            self._desconectado.set()
 
         self.dados_recebidos = {}
-        self.rodando = True
+
+        # Gravação dos quadros enviados e da telemetria lida (recorder.Gravador)
+        self.recorder = None
+
+        self._configurar_telemetria(telemetria, capacidade_historico)
+
+        # Contadores da escrita direta (sem EscritorSerial)
+        self.quadros_escritos = 0
+        self.erros_escrita = 0
+        self.bytes_escritos = 0
+        self.escritas_lentas = 0
+
+        self.escritor = None
+        if escrita_assincrona:
+            self.escritor = EscritorSerial(self.ser, self.registrar_envio, self._marcar_desconectado,
+                                           self._gravar_quadro)
+
+        self.thread_conexao = None
+        if reconectar:
+            self.thread_conexao = threading.Thread(target=self._gerenciar_conexao, daemon=True)
+            self.thread_conexao.start()
         
-        self.thread_leitura = threading.Thread(target=self._ler_dados_serial)
-        self.thread_leitura.daemon = True
-        self.thread_leitura.start()
+        self.thread_leitura = None
+        if iniciar_leitura:
+            self.thread_leitura = threading.Thread(target=self._ler_dados_serial)
+            self.thread_leitura.daemon = True
+            self.thread_leitura.start()
 
     def _ler_dados_serial(self):
         """
         Método executado em segundo plano pela thread para ler e processar dados.
+        A leitura fica bloqueada na porta até chegar pelo menos um byte (ou vencer o timeout)
+        e então consome tudo o que já estiver no buffer do sistema.
         """
         while self.rodando:
-            if self.ser and self.ser.in_waiting > 0:
-                try:
-                    linha_bytes = self.ser.readline()
-                    linha_str = linha_bytes.decode('utf-8').strip()
-                    linha_str = linha_str.rstrip('\x00')
+            if not self.conectado.wait(self.timeout):
+                continue
 
-                    if not linha_str:
-                        continue
+            ser = self.ser
+            try:
+                dados = ser.read(ser.in_waiting or 1)
+            except Exception as e:
+                if self.rodando:
+                    self._marcar_desconectado(e, ser)
+                continue
 
-                    # print(f"[DEBUG] Recebido: '{linha_str}'")
-                    
-                    partes = linha_str.split(',')
-
-                    if len(partes) >= 2 and len(partes) % 6 == 0:
-                        for i in range(0, len(partes), 6):
-                            bloco = partes[i:i+6]
-                            try:
-                                id_robo = int(bloco[0])
-                                velocidades = [float(v) for v in bloco[1:5]]
-                                latencia = float(bloco[5])
-
-                                self.dados_recebidos[id_robo] = {
-                                    'velocidades': velocidades,
-                                    'latencia': latencia,
-                                    'timestamp': time.time()
-                                }
-                            except (ValueError, IndexError):
-                                print(f"  -> Aviso: Bloco de dados mal formatado: {bloco}")
-
-                    else:
-                        self.dados_recebidos['raw'] = linha_str
-
-                except UnicodeDecodeError:
-                    print(f"  -> Aviso: Erro de decodificação de bytes. Dados recebidos podem estar corrompidos.")
+            if dados:
+                if self.recorder is not None:
+                    self.recorder.telemetria(dados)
+                try:
+                    self._receber_bytes(dados)
                 except Exception as e:
                     print(f"  -> Erro inesperado na thread de leitura: {e}")
-            
-            time.sleep(0.01)
 
-    def enviar_comando(self, comando):
+    def _abrir(self):
+        """Procura o dispositivo e abre a porta. Lança serial.SerialException se não conseguir."""
+        porta = descobrir_porta(self.porta, self.vid_pid)
+        if porta is None:
+            raise serial.SerialException(f"Nenhum dispositivo encontrado para '{self.porta}' (VID:PID {self.vid_pid}).")
+        return serial.Serial(porta, self.baudrate, timeout=self.timeout)
+
+    def _marcar_desconectado(self, erro, ser):
+        """
+        Descrição:
+            Registra a queda da porta (erro de leitura ou escrita), fecha-a e acorda a
+            reconexão. Chamadas repetidas durante a mesma queda são ignoradas, assim como
+            erros de uma porta que a reconexão já substituiu.
+        Entradas:
+            erro:   Exceção que indicou a queda
+            ser:    Porta em que a leitura ou escrita falhou
+        """
+        with self._lock_conexao:
+            if not self.conectado.is_set() or ser is not self.ser:
+                return
+            self.conectado.clear()
+            self.desconexoes += 1
+            self._instante_queda = time.monotonic()
+
+        print(f"  -> Conexão serial perdida: {erro}")
+        try:
+            ser.close()
+        except Exception:
+            pass
+        if self.reconectar:
+            self._desconectado.set()
+
+    def _gerenciar_conexao(self):
+        """
+        Método executado pela thread de reconexão. Após uma queda, tenta reabrir a porta com
+        espera crescente (RECONEXAO_ESPERA_MIN ... RECONEXAO_ESPERA_MAX) e, quando consegue,
+        troca a porta usada pela leitura e pelo escritor de uma só vez.
+        """
+        espera = RECONEXAO_ESPERA_MIN
+        while True:
+            self._desconectado.wait()
+            if self._parada.is_set():
+                return
+
+            try:
+                novo = self._abrir()
+            except (serial.SerialException, OSError):
+                if self._parada.wait(espera):
+                    return
+                espera = min(2 * espera, RECONEXAO_ESPERA_MAX)
+                continue
+
+            with self._lock_conexao:
+                self.ser = novo
+                if self.escritor:
+                    self.escritor.ser = novo
+                self._rx.clear()     # Restos de linha/quadro da conexão anterior
+                self._desconectado.clear()
+                self.reconexoes += 1
+                self.ultima_recuperacao = time.monotonic() - self._instante_queda
+                self.recuperacao_max = max(self.recuperacao_max, self.ultima_recuperacao)
+                self.conectado.set()
+
+            print(f"Porta serial '{novo.port}' reaberta após {self.ultima_recuperacao:.2f} s.")
+            espera = RECONEXAO_ESPERA_MIN
+
+    def get_stats_conexao(self):
+        """Retorna o estado e os contadores da conexão serial (tempos em s)."""
+        return {
+            'conectado': self.conectado.is_set(),
+            'desconexoes': self.desconexoes,
+            'reconexoes': self.reconexoes,
+            'quadros_descartados': self.quadros_descartados,
+            'ultima_recuperacao': self.ultima_recuperacao,
+            'recuperacao_max': self.recuperacao_max,
+        }
+
+    def _configurar_telemetria(self, telemetria, capacidade_historico=TELEMETRIA_HISTORICO):
+        """
+        Descrição:
+            Prepara o enquadramento da telemetria recebida.
+        Entradas:
+            telemetria:             'csv' ou 'binaria'
+            capacidade_historico:   Amostras guardadas por robô
+        """
+        if telemetria == 'csv':
+            self._receber_bytes = self._receber_linhas
+        elif telemetria == 'binaria':
+            self._receber_bytes = self._receber_quadros
+        else:
+            raise ValueError(f"Formato de telemetria desconhecido: '{telemetria}'")
+        self.telemetria = telemetria
+
+        # Bytes recebidos que ainda não formaram uma linha ou quadro completo
+        self._rx = bytearray()
+
+        # Histórico por robô, criado na primeira telemetria de cada um
+        self.capacidade_historico = capacidade_historico
+        self.historico = {}
+
+        # Função chamada com (id, tempo, v1, v2, v3, v4, latência) a cada amostra de telemetria
+        # (ex.: TelemetriaCompartilhada.registrar na ponte multiprocesso)
+        self.ao_telemetria = None
+
+        # Contadores da telemetria
+        self.quadros_telemetria = 0
+        self.erros_telemetria = 0
+
+        # RTT: instante de envio de cada sequência e histograma por robô
+        self._envio_seq = np.full(RTT_JANELA_SEQ, -1, dtype=np.int32)
+        self._envio_t = np.zeros(RTT_JANELA_SEQ, dtype=np.float64)
+        self._ultimo_eco = {}
+        self.rtt = {}
+
+    def _receber_linhas(self, dados):
+        """
+        Descrição:
+            Acumula os bytes recebidos e processa cada linha completa. Uma linha partida entre
+            duas leituras fica guardada até a chegada do restante.
+        Entradas:
+            dados:  Bytes lidos da porta
+        """
+        rx = self._rx
+        inicio_busca = len(rx)
+        rx += dados
+
+        inicio = 0
+        while True:
+            fim = rx.find(b'\n', inicio_busca)
+            if fim < 0:
+                break
+            self._processar_linha(bytes(rx[inicio:fim + 1]))
+            inicio = inicio_busca = fim + 1
+
+        if inicio:
+            del rx[:inicio]
+        if len(rx) > SERIAL_RX_MAX:
+            print(f"  -> Aviso: {len(rx)} bytes sem fim de linha descartados.")
+            rx.clear()
+
+    def _receber_quadros(self, dados):
+        """
+        Descrição:
+            Acumula os bytes recebidos e processa cada quadro binário completo. Quadros com CRC
+            ou tamanho inválido são descartados e a busca recomeça no byte seguinte ao 
+            sincronismo, realinhando o fluxo.
+        Entradas:
+            dados:  Bytes lidos da porta
+        """
+        rx = self._rx
+        rx += dados
+        tamanho_bloco = TELEMETRIA_BLOCO.size
+
+        pos = 0
+        while True:
+            inicio = rx.find(TELEMETRIA_SYNC, pos)
+            if inicio < 0:
+                # Mantém um possível primeiro byte de sincronismo no fim do buffer
+                pos = len(rx) - 1 if rx.endswith(TELEMETRIA_SYNC[:1]) else len(rx)
+                break
+            if len(rx) - inicio < TELEMETRIA_CABECALHO:
+                pos = inicio
+                break
+
+            tamanho = rx[inicio + 2]
+            fim = inicio + TELEMETRIA_CABECALHO + tamanho + TELEMETRIA_CRC.size
+            if len(rx) < fim:
+                pos = inicio
+                break
+
+            crc = TELEMETRIA_CRC.unpack_from(rx, fim - TELEMETRIA_CRC.size)[0]
+            if tamanho % tamanho_bloco or crc16(rx[inicio + 2:fim - TELEMETRIA_CRC.size]) != crc:
+                self.erros_telemetria += 1
+                pos = inicio + 1
+                continue
+
+            for offset in range(inicio + TELEMETRIA_CABECALHO, inicio + TELEMETRIA_CABECALHO + tamanho, tamanho_bloco):
+                id_robo, seq, v1, v2, v3, v4, latencia = TELEMETRIA_BLOCO.unpack_from(rx, offset)
+                self._registrar_telemetria(id_robo, v1, v2, v3, v4, latencia)
+                self._registrar_eco(id_robo, seq)
+            self.quadros_telemetria += 1
+            pos = fim
+
+        if pos:
+            del rx[:pos]
+
+    def _processar_linha(self, linha_bytes):
+        """
+        Descrição:
+            Interpreta uma linha de telemetria em blocos de 6 campos separados por vírgula
+            (id, 4 velocidades e latência). Linhas em outro formato ficam em dados_recebidos['raw'].
+        Entradas:
+            linha_bytes:    Linha recebida pela serial (bytes)
+        """
+        try:
+            linha_str = linha_bytes.decode('utf-8').strip()
+        except UnicodeDecodeError:
+            self.erros_telemetria += 1
+            print(f"  -> Aviso: Erro de decodificação de bytes. Dados recebidos podem estar corrompidos.")
+            return
+        linha_str = linha_str.rstrip('\x00')
+
+        if not linha_str:
+            return
+
+        # print(f"[DEBUG] Recebido: '{linha_str}'")
+        
+        partes = linha_str.split(',')
+
+        if len(partes) >= 2 and len(partes) % 6 == 0:
+            for i in range(0, len(partes), 6):
+                bloco = partes[i:i+6]
+                try:
+                    id_robo = int(bloco[0])
+                    velocidades = [float(v) for v in bloco[1:5]]
+                    latencia = float(bloco[5])
+                except (ValueError, IndexError):
+                    self.erros_telemetria += 1
+                    print(f"  -> Aviso: Bloco de dados mal formatado: {bloco}")
+                    continue
+                self._registrar_telemetria(id_robo, *velocidades, latencia)
+            self.quadros_telemetria += 1
+
+        else:
+            self.dados_recebidos['raw'] = linha_str
+
+    def _registrar_telemetria(self, id_robo, v1, v2, v3, v4, latencia):
+        """Acrescenta uma amostra de telemetria ao histórico do robô."""
+        historico = self.historico.get(id_robo)
+        if historico is None:
+            historico = self.historico[id_robo] = HistoricoTelemetria(self.capacidade_historico)
+        tempo = time.time()
+        historico.registrar(tempo, v1, v2, v3, v4, latencia)
+        if self.ao_telemetria is not None:
+            self.ao_telemetria(id_robo, tempo, v1, v2, v3, v4, latencia)
+
+    def registrar_envio(self, seq):
+        """
+        Descrição:
+            Guarda o instante de envio de um quadro enquadrado, para casar com o eco na
+            telemetria. Chamado por enviar_comando ou por quem escreve na porta diretamente.
+        Entradas:
+            seq:    Sequência do quadro (CodificadorComando.seq)
+        """
+        indice = seq % RTT_JANELA_SEQ
+        self._envio_t[indice] = time.perf_counter()
+        self._envio_seq[indice] = seq
+
+    def _registrar_eco(self, id_robo, seq):
+        """
+        Descrição:
+            Mede o RTT quando um robô ecoa uma sequência nova. O eco se repete em toda a
+            telemetria até chegar o próximo comando, então só a primeira ocorrência conta.
+            Sequência 0 indica que o robô ainda não recebeu comando enquadrado.
+        """
+        if seq == 0 or self._ultimo_eco.get(id_robo) == seq:
+            return
+        self._ultimo_eco[id_robo] = seq
+
+        indice = seq % RTT_JANELA_SEQ
+        if self._envio_seq[indice] != seq:
+            return      # Eco antigo demais ou de um envio que não foi registrado
+
+        histograma = self.rtt.get(id_robo)
+        if histograma is None:
+            histograma = self.rtt[id_robo] = HistogramaLatencia()
+        histograma.registrar(time.perf_counter() - self._envio_t[indice])
+
+    def estatisticas_rtt(self, id_robo=None):
+        """
+        Descrição:
+            Resumo do tempo de ida e volta PC -> transmissor -> robô -> PC.
+        Entradas:
+            id_robo:    Robô desejado ou None para todos
+        Retorna:
+            Dicionário com amostras, p50, p99 e max (s); sem id_robo, um desses por robô.
+        """
+        if id_robo is not None:
+            histograma = self.rtt.get(id_robo)
+            return histograma.resumo() if histograma else HistogramaLatencia().resumo()
+        return {id_robo: histograma.resumo() for id_robo, histograma in sorted(self.rtt.items())}
+
+    def enviar_comando(self, comando, seq=None):
         """
         Método que envia uma string de comando ou um objeto de bytes para a porta serial.
+        Aceita também bytearray e memoryview, como o quadro retornado por CodificadorComando.
+        Com seq (quadro enquadrado), registra o instante de envio para a medição de RTT.
+        Com escrita assíncrona, apenas entrega o quadro ao EscritorSerial e retorna.
+        Sem conexão, o quadro é descartado e contado em quadros_descartados.
         """
+        if not self.conectado.is_set():
+            self.quadros_descartados += 1
+            return
+
         if self.ser and self.ser.is_open:
             dados_para_enviar = None
             
@@ -224,42 +1607,202 @@ class ComunicacaoSerial:
                 dados_para_enviar = comando.encode('utf-8')
             
             # Se o comando já for bytes, use-o diretamente.
-            elif isinstance(comando, bytes):
+            elif isinstance(comando, (bytes, bytearray, memoryview)):
                 dados_para_enviar = comando
             
             else:
                 print(f"ERRO: Tipo de dado '{type(comando)}' não pode ser enviado.")
                 return
 
+            if self.escritor:
+                self.escritor.publicar(dados_para_enviar, seq)
+                return
+
+            ser = self.ser
             try:
-                self.ser.write(dados_para_enviar)
+                inicio = time.perf_counter()
+                ser.write(dados_para_enviar)
+                if time.perf_counter() - inicio > ESCRITA_LENTA:
+                    self.escritas_lentas += 1
+                self.quadros_escritos += 1
+                self.bytes_escritos += len(dados_para_enviar)
+                self._gravar_quadro(dados_para_enviar)
+                if seq is not None:
+                    self.registrar_envio(seq)
                 # print(f"[DEBUG] Enviado: {dados_para_enviar}")
-            except serial.SerialException as e:
+            except (serial.SerialException, OSError) as e:
+                self.erros_escrita += 1
                 print(f"ERRO ao enviar dados: {e}")
+                self._marcar_desconectado(e, ser)
+
+    def _gravar_quadro(self, quadro):
+        """Grava um quadro já escrito na porta; os substituídos ou com erro não entram no log."""
+        if self.recorder is not None:
+            self.recorder.quadro(quadro)
+
+    def get_stats_escrita(self):
+        """
+        Retorna os contadores da escrita na serial: os do EscritorSerial com escrita
+        assíncrona, ou os da escrita direta em enviar_comando.
+        """
+        if self.escritor:
+            return self.escritor.get_stats()
+        return {
+            'quadros_escritos': self.quadros_escritos,
+            'quadros_sobrescritos': 0,
+            'erros_escrita': self.erros_escrita,
+            'bytes_escritos': self.bytes_escritos,
+            'escritas_lentas': self.escritas_lentas,
+        }
 
     def get_dados(self, id_robo):
-        """Retorna os últimos dados recebidos para um ID específico."""
-        return self.dados_recebidos.get(id_robo)
+        """
+        Retorna os últimos dados recebidos para um ID específico, no formato
+        {'velocidades', 'latencia', 'timestamp'}. O dicionário é montado a partir do histórico
+        apenas quando consultado. Outras chaves (como 'raw') vêm de dados_recebidos.
+        """
+        historico = self.historico.get(id_robo)
+        if historico is None:
+            return self.dados_recebidos.get(id_robo)
+
+        ultima = historico.ultima()
+        if ultima is None:
+            return None
+        return {
+            'velocidades': ultima[TEL_V1:TEL_LATENCIA].tolist(),
+            'latencia': float(ultima[TEL_LATENCIA]),
+            'timestamp': float(ultima[TEL_TEMPO])
+        }
+
+    def get_historico(self, id_robo):
+        """Retorna o HistoricoTelemetria de um robô, ou None se ele ainda não enviou telemetria."""
+        return self.historico.get(id_robo)
 
     def fechar(self):
         """Fecha a porta serial e termina a thread de forma segura."""
         print("Fechando a comunicação serial...")
         self.rodando = False
-        self.thread_leitura.join()
+        self._parada.set()
+        self._desconectado.set()
+        if self.thread_conexao:
+            self.thread_conexao.join()
+        if self.escritor:
+            self.escritor.parar()
+        if self.thread_leitura:
+            self.thread_leitura.join()
         if self.ser and self.ser.is_open:
             self.ser.close()
             print("Porta serial fechada.")
-    
-    def decode_message(self, message):
-        id_robot = message.robot_commands[0].id
-        wheel_velocity_front_right = message.robot_commands[0].move_command.wheel_velocity.front_right
-        wheel_velocity_back_right = message.robot_commands[0].move_command.wheel_velocity.back_right
-        wheel_velocity_back_left = message.robot_commands[0].move_command.wheel_velocity.back_left
-        wheel_velocity_front_left = message.robot_commands[0].move_command.wheel_velocity.front_left
-        kick_speed = message.robot_commands[0].kick_speed
-        self.robots[id_robot].wheel_velocity_front_right = wheel_velocity_front_right
-        self.robots[id_robot].wheel_velocity_back_right = wheel_velocity_back_right
-        self.robots[id_robot].wheel_velocity_back_left = wheel_velocity_back_left
-        self.robots[id_robot].wheel_velocity_front_left = wheel_velocity_front_left
-        self.robots[id_robot].cont_not_message = 0
-        self.robots[id_robot].kick_speed = kick_speed
\ No newline at end of file
+
+def _traduzir_telemetria(funcao, robos):
+    """Callback de telemetria de uma porta que troca a posição no quadro pelo id do time."""
+    def ao_telemetria(posicao, *valores):
+        if 0 <= posicao < len(robos):
+            funcao(robos[posicao], *valores)
+    return ao_telemetria
+
+class TransmissoresSerial:
+    """
+    Descrição:
+        Distribui o time entre vários transmissores, cada um com sua porta, seu subconjunto de
+        robôs, seu CodificadorComando e seu EscritorSerial. A cada tick monta um quadro por
+        porta e entrega todos aos escritores, que escrevem em paralelo dentro do mesmo tick.
+        Cada transmissor identifica a telemetria pela posição do robô no seu quadro (0 a n-1);
+        get_dados, estatisticas_rtt e ligar_telemetria traduzem para o id do time.
+    Entradas:
+        transmissores:  Lista de (porta, robôs), com os robôs na ordem em que entram no quadro
+        enquadrado:     Envia comandos com sincronismo, sequência e CRC
+        inverter:       -1 para inverter o sentido dos motores, 1 caso contrário
+        **kwargs:       Repassados a cada ComunicacaoSerial (baudrate, telemetria, ...). Com 
+                        escrita_assincrona=False as portas são escritas uma após a outra.
+    """
+    def __init__(self, transmissores, enquadrado=False, inverter=-1, **kwargs):
+        kwargs.setdefault('escrita_assincrona', True)
+
+        todos = [id_robot for _, robos in transmissores for id_robot in robos]
+        if len(todos) != len(set(todos)):
+            raise ValueError(f"Robô atribuído a mais de um transmissor: {todos}")
+
+        self.robos = []
+        self.comunicadores = []
+        self.montadores = []
+        self.codificadores = []
+        try:
+            for porta, robos in transmissores:
+                self.comunicadores.append(ComunicacaoSerial(porta, **kwargs))
+                self.robos.append(tuple(robos))
+                self.montadores.append(MontadorQuadro(robos, inverter=inverter))
+                self.codificadores.append(CodificadorComando(5 * len(robos), enquadrado))
+        except Exception:
+            self.fechar()
+            raise
+
+        # id do time -> (comunicador, posição do robô no quadro, que é o id da telemetria dele)
+        self._posicoes = {id_robo: (comunicador, posicao)
+                          for comunicador, robos in zip(self.comunicadores, self.robos)
+                          for posicao, id_robo in enumerate(robos)}
+
+    @staticmethod
+    def n_robots(transmissores):
+        """
+        Descrição:
+            Tamanho do time no Receiver para cobrir todos os robôs atribuídos (mínimo 3, o
+            padrão do Receiver). Estático para ser usado antes de abrir as portas.
+        Entradas:
+            transmissores:  Lista de (porta, robôs), como no construtor
+        """
+        return max([3] + [max(robos) + 1 for _, robos in transmissores if robos])
+
+    @property
+    def ultimos_valores(self):
+        """Valores do último quadro de cada transmissor (arrays reutilizados pelos montadores)."""
+        return [montador.quadro for montador in self.montadores]
+
+    def enviar(self, estado):
+        """
+        Descrição:
+            Monta e entrega o quadro de cada transmissor.
+        Entradas:
+            estado:     Array retornado por RobotStateStore.snapshot
+        """
+        for comunicador, montador, codificador in zip(self.comunicadores, self.montadores, self.codificadores):
+            quadro = codificador.codificar(montador.montar(estado))
+            comunicador.enviar_comando(quadro, seq=codificador.seq if codificador.enquadrado else None)
+
+    def ocupacao_banda(self, control_fps):
+        """
+        Retorna:
+            Fração do baud rate de cada porta ocupada pelos comandos a control_fps (8N1,
+            10 bits por byte). Acima de 1 o enlace não comporta a taxa.
+        """
+        return [codificador.tamanho * 10 * control_fps / comunicador.baudrate
+                for comunicador, codificador in zip(self.comunicadores, self.codificadores)]
+
+    def get_dados(self, id_robo):
+        """Retorna os últimos dados do robô (id do time) no transmissor que o controla."""
+        if id_robo not in self._posicoes:
+            return None
+        comunicador, posicao = self._posicoes[id_robo]
+        return comunicador.get_dados(posicao)
+
+    def estatisticas_rtt(self, id_robo):
+        """Retorna o RTT do robô (id do time) medido no transmissor que o controla."""
+        if id_robo not in self._posicoes:
+            return HistogramaLatencia().resumo()
+        comunicador, posicao = self._posicoes[id_robo]
+        return comunicador.estatisticas_rtt(posicao)
+
+    def ligar_telemetria(self, funcao):
+        """
+        Descrição:
+            Define o ComunicacaoSerial.ao_telemetria de todas as portas, com o id da telemetria
+            traduzido para o id do time. Posições fora do quadro da porta são ignoradas.
+        Entradas:
+            funcao:     Chamada com (id do time, tempo, v1, v2, v3, v4, latência)
+        """
+        for comunicador, robos in zip(self.comunicadores, self.robos):
+            comunicador.ao_telemetria = _traduzir_telemetria(funcao, robos)
+
+    def fechar(self):
+        for comunicador in self.comunicadores:
+            comunicador.fechar()
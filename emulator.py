@@ -0,0 +1,225 @@
+"""
+Emulador do firmware do STM (transmissor) em um pseudo-terminal, para testar e medir a ponte
+sem a placa.
+
+Abre um par pty, imprime o caminho do lado escravo (use-o em SERIAL_PORT) e, para cada quadro
+de comando recebido, responde com a telemetria dos robôs do quadro: as velocidades recebidas
+(em rad/s) e a latência emulada. Atraso, jitter, corrupção de bytes e divisão das respostas em
+duas escritas são configuráveis.
+
+Uso:
+    python emulator.py [--robots 3] [--delay 2] [--jitter 1] [--corrupt 0] [--split 0]
+                       [--telemetria csv|binaria] [--enquadrado]
+"""
+import os
+import tty
+import heapq
+import random
+import select
+import struct
+import argparse
+import threading
+import time
+
+from communicators import CONV_RAD_HZ, COMANDO_SYNC, COMANDO_CRC, crc16, montar_quadro_telemetria
+
+class EmuladorSTM:
+    """
+    Descrição:
+        Emula o transmissor do lado do PC: decodifica os quadros de comando (crus ou
+        enquadrados com CodificadorComando) e agenda a resposta de telemetria de cada um.
+    Entradas:
+        n_robos:        Robôs por quadro (5 inteiros cada)
+        atraso:         Atraso (s) entre receber o comando e responder
+        jitter:         Variação (s) somada ao atraso, uniforme em [0, jitter]
+        corrupcao:      Probabilidade de cada byte da resposta ser trocado por um aleatório
+        divisao:        Probabilidade de a resposta ser escrita em duas partes
+        intervalo_divisao:  Intervalo (s) entre as duas partes de uma resposta dividida
+        telemetria:     'csv' (linhas de texto) ou 'binaria' (quadros com CRC)
+        enquadrado:     Os comandos chegam com sincronismo, sequência e CRC
+        semente:        Semente do gerador aleatório, para repetir um cenário
+    """
+    def __init__(self, n_robos=3, atraso=0.002, jitter=0.001, corrupcao=0.0, divisao=0.0,
+                 intervalo_divisao=0.001, telemetria='csv', enquadrado=False, semente=None):
+        if telemetria not in ('csv', 'binaria'):
+            raise ValueError(f"Formato de telemetria desconhecido: '{telemetria}'")
+
+        self.n_robos = n_robos
+        self.atraso = atraso
+        self.jitter = jitter
+        self.corrupcao = corrupcao
+        self.divisao = divisao
+        self.intervalo_divisao = intervalo_divisao
+        self.telemetria = telemetria
+        self.enquadrado = enquadrado
+        self.aleatorio = random.Random(semente)
+
+        self._valores = struct.Struct(f'<{5 * n_robos}i')
+        if enquadrado:
+            self._cabecalho = len(COMANDO_SYNC) + 2
+            self.tamanho_quadro = self._cabecalho + self._valores.size + COMANDO_CRC.size
+        else:
+            self.tamanho_quadro = self._valores.size
+
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)      # Sem eco nem tradução de fim de linha
+        os.set_blocking(self.master, False)
+        self.porta = os.ttyname(self.slave)
+
+        self._rx = bytearray()
+        self._agenda = []           # Heap de (instante, ordem, bytes)
+        self._ordem = 0
+        self._parada = threading.Event()
+        self.thread = None
+
+        # Contadores
+        self.comandos = 0
+        self.erros_comando = 0
+        self.respostas = 0
+        self.bytes_descartados = 0
+
+    def iniciar(self):
+        """Executa o emulador em uma thread daemon e retorna o caminho da porta."""
+        self.thread = threading.Thread(target=self.executar, daemon=True)
+        self.thread.start()
+        return self.porta
+
+    def parar(self):
+        self._parada.set()
+        if self.thread:
+            self.thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def executar(self):
+        """Laço principal: lê comandos e escreve as respostas nos instantes agendados."""
+        while not self._parada.is_set():
+            espera = 0.05
+            if self._agenda:
+                espera = max(0.0, min(espera, self._agenda[0][0] - time.monotonic()))
+
+            prontos, _, _ = select.select([self.master], [], [], espera)
+            if prontos:
+                try:
+                    dados = os.read(self.master, 4096)
+                except (BlockingIOError, OSError):
+                    dados = b''
+                if dados:
+                    self._receber(dados, time.monotonic())
+
+            agora = time.monotonic()
+            while self._agenda and self._agenda[0][0] <= agora:
+                self._escrever(heapq.heappop(self._agenda)[2])
+
+    def _receber(self, dados, instante):
+        rx = self._rx
+        rx += dados
+        if self.enquadrado:
+            self._receber_enquadrados(instante)
+        else:
+            n_quadros = len(rx) // self.tamanho_quadro
+            for k in range(n_quadros):
+                self._responder(self._valores.unpack_from(rx, k * self.tamanho_quadro), 0, instante)
+            del rx[:n_quadros * self.tamanho_quadro]
+
+    def _receber_enquadrados(self, instante):
+        rx = self._rx
+        pos = 0
+        while True:
+            inicio = rx.find(COMANDO_SYNC, pos)
+            if inicio < 0:
+                pos = len(rx) - 1 if rx.endswith(COMANDO_SYNC[:1]) else len(rx)
+                break
+            fim = inicio + self.tamanho_quadro
+            if len(rx) < fim:
+                pos = inicio
+                break
+
+            crc = COMANDO_CRC.unpack_from(rx, fim - COMANDO_CRC.size)[0]
+            if crc16(rx[inicio + len(COMANDO_SYNC):fim - COMANDO_CRC.size]) != crc:
+                self.erros_comando += 1
+                pos = inicio + 1
+                continue
+
+            seq = struct.unpack_from('<H', rx, inicio + len(COMANDO_SYNC))[0]
+            self._responder(self._valores.unpack_from(rx, inicio + self._cabecalho), seq, instante)
+            pos = fim
+        if pos:
+            del rx[:pos]
+
+    def _responder(self, valores, seq, instante):
+        """Monta a telemetria de um comando e agenda a escrita (ou as duas partes dela)."""
+        self.comandos += 1
+        atraso = self.atraso + self.aleatorio.uniform(0, self.jitter)
+
+        blocos = []
+        for id_robo in range(self.n_robos):
+            rodas = [v / CONV_RAD_HZ for v in valores[5 * id_robo:5 * id_robo + 4]]
+            blocos.append((id_robo, seq, *rodas, atraso))
+
+        if self.telemetria == 'binaria':
+            resposta = montar_quadro_telemetria(blocos)
+        else:
+            resposta = (','.join(f'{b[0]},{b[2]:.3f},{b[3]:.3f},{b[4]:.3f},{b[5]:.3f},{b[6]:.4f}'
+                                 for b in blocos) + '\n').encode()
+        resposta = self._corromper(resposta)
+        self.respostas += 1
+
+        instante += atraso
+        if self.divisao and self.aleatorio.random() < self.divisao:
+            corte = self.aleatorio.randrange(1, len(resposta))
+            self._agendar(instante, resposta[:corte])
+            self._agendar(instante + self.intervalo_divisao, resposta[corte:])
+        else:
+            self._agendar(instante, resposta)
+
+    def _corromper(self, resposta):
+        if not self.corrupcao:
+            return resposta
+        resposta = bytearray(resposta)
+        for i in range(len(resposta)):
+            if self.aleatorio.random() < self.corrupcao:
+                resposta[i] = self.aleatorio.randrange(256)
+        return bytes(resposta)
+
+    def _agendar(self, instante, dados):
+        self._ordem += 1
+        heapq.heappush(self._agenda, (instante, self._ordem, dados))
+
+    def _escrever(self, dados):
+        # Se a ponte não estiver lendo e o buffer do pty encher, a resposta é descartada
+        try:
+            enviados = os.write(self.master, dados)
+        except BlockingIOError:
+            enviados = 0
+        except OSError:
+            return
+        self.bytes_descartados += len(dados) - enviados
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--robots', type=int, default=3, help='Robôs por quadro de comando')
+    parser.add_argument('--delay', type=float, default=2.0, help='Atraso da resposta (ms)')
+    parser.add_argument('--jitter', type=float, default=1.0, help='Jitter somado ao atraso (ms)')
+    parser.add_argument('--corrupt', type=float, default=0.0, help='Probabilidade de corromper cada byte')
+    parser.add_argument('--split', type=float, default=0.0, help='Probabilidade de dividir cada resposta')
+    parser.add_argument('--split-gap', type=float, default=1.0, help='Intervalo entre as partes (ms)')
+    parser.add_argument('--telemetria', choices=('csv', 'binaria'), default='csv')
+    parser.add_argument('--enquadrado', action='store_true', help='Comandos com sincronismo, sequência e CRC')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    emulador = EmuladorSTM(args.robots, args.delay / 1e3, args.jitter / 1e3, args.corrupt, args.split,
+                           args.split_gap / 1e3, args.telemetria, args.enquadrado, args.seed)
+    print(f"Emulador do STM em {emulador.porta} (use em SERIAL_PORT). Ctrl+C para sair.")
+    try:
+        emulador.executar()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"{emulador.comandos} comandos, {emulador.erros_comando} com erro, "
+              f"{emulador.respostas} respostas, {emulador.bytes_descartados} bytes descartados")
+
+
+if __name__ == '__main__':
+    main()
@@ -313,9 +313,12 @@ while running:
     if pressed_keys[pygame.K_0] or pressed_keys[pygame.K_KP0]: kick_2 = 1
 
     if active_box is None and connected:
-        actuator.send_localVelocity_message(0, vx_0, vy_0, w_0, kick_0)
-        actuator.send_localVelocity_message(1, vx_1, vy_1, w_1, kick_1)
-        actuator.send_localVelocity_message(2, vx_2, vy_2, w_2, kick_2)
+        # Um único datagrama com os comandos dos três robôs
+        actuator.send_team_localVelocity_message([
+            (0, vx_0, vy_0, w_0, kick_0),
+            (1, vx_1, vy_1, w_1, kick_1),
+            (2, vx_2, vy_2, w_2, kick_2),
+        ])
 
     pygame.display.flip()
 
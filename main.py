@@ -1,16 +1,44 @@
+import sys
 import time
-import struct
+import atexit
 import numpy as np
-from communicators import Receiver, ComunicacaoSerial
-
-CONV_RAD_HZ = 2*np.pi        # Conversão das velocidades para rad/s
+from scheduler import Agendador, AgendadorEventos
+from ticklog import RegistroAssincrono, NIVEL_NADA, NIVEL_RESUMO, NIVEL_DETALHE
+from recorder import Gravador
+from metrics import Metricas, ServidorMetricas
+from communicators import (Receiver, TransmissoresSerial, MontadorQuadro,
+                           FRONT_RIGHT, BACK_RIGHT, BACK_LEFT, FRONT_LEFT, KICK)
 
 RECEIVER_PORT = 10322       # Mesma porta que o código está mandando os comandos
 CONTROL_FPS = 60        # Taxa de envio para o STM (Pode alterar aqui se necessário)
+CONTROL_SPIN = 0.0005       # Tempo (s) final antes de cada tick feito em espera ativa (0 só usa sleep)
+CONTROL_OVERRUN = 'pular'   # Tick atrasado mais de um período: 'pular' os perdidos ou 'recuperar' todos
+CONTROL_MODE = 'fixo'       # 'fixo' envia a CONTROL_FPS; 'evento' envia assim que chega comando (CONTROL_FPS vira keepalive)
+CONTROL_MIN_GAP = 0.006     # Modo 'evento': intervalo (s) mínimo entre quadros, dentro do baud rate da serial
+CONTROL_TEAM_UPDATE = False # Modo 'evento': espera todos os robôs serem atualizados antes de enviar
+RECEIVER_MODE = 'event'     # 'event' acorda só quando chega pacote, 'timer' usa o laço a RECEIVER_FPS
+RECEIVER_BATCH = True       # Esvazia a fila do socket a cada despertar, mantendo o comando mais novo de cada robô
+ASYNC_BRIDGE = False        # Roda a ponte inteira em um único laço asyncio (bridge_async.py)
+MULTIPROCESS_BRIDGE = False # Receiver e serial em processos separados, com estado em memória compartilhada (bridge_multiprocess.py)
 
 SERIAL_FLAG = True      # Habilita a comunicação por SERIAL (False para testar o SOCKET)
 SERIAL_PORT = '/dev/ttyACM1'        # Conferir a USB utilizada
 SERIAL_BAUD_RATE = 115200
+SERIAL_TELEMETRY = 'csv'    # Formato da telemetria do STM: 'csv' (texto) ou 'binaria' (quadros com CRC)
+SERIAL_FRAMED = False       # Envia comandos com sincronismo, sequência e CRC (o firmware precisa suportar)
+SERIAL_ASYNC_WRITE = True   # Escreve na serial em uma thread própria, sem bloquear o laço de controle
+SERIAL_RECONNECT = True     # Reabre a porta em segundo plano se o transmissor for desconectado
+SERIAL_VID_PID = None       # (VID, PID) USB do transmissor; com SERIAL_PORT = '/dev/ttyACM*' acha a porta mesmo se mudar de nome
+
+# Transmissores: (porta, robôs na ordem do quadro). Para mais robôs, um transmissor por grupo, ex.:
+# [('/dev/ttyACM0', (2, 1, 0)), ('/dev/ttyACM1', (5, 4, 3)), ('/dev/ttyACM2', (8, 7, 6)), ('/dev/ttyACM3', (10, 9))]
+SERIAL_TRANSMITTERS = [(SERIAL_PORT, (2, 1, 0))]
+
+LOG_LEVEL = NIVEL_DETALHE   # NIVEL_NADA (sem custo no laço), NIVEL_RESUMO (telemetria) ou NIVEL_DETALHE (estado e quadros)
+LOG_RATE = 2                # Impressões por segundo no terminal
+LOG_BINARY = None           # Caminho para gravar todos os registros em binário (ticklog.ler_log_binario)
+RECORD_FILE = None          # Caminho para gravar datagramas, quadros e telemetria (python recorder.py replay ...)
+METRICS_ADDRESS = ('127.0.0.1', 9108)   # Métricas Prometheus em http://.../metrics; caminho str usa socket UNIX; None desliga
 
 # O código principal inverte os motores, coloque True para desinverter
 MAIN_CODE = True
@@ -25,107 +53,191 @@ if MAIN_CODE:
 else:
     inverter = 1
 
-# Inicialização do recebimento das mensagens via socket
-receiver = Receiver(port=RECEIVER_PORT, logger=False)
-receiver.start_thread()
-
-# Inicialização do objeto serial
-comunicador = None
+if ASYNC_BRIDGE:
+    from bridge_async import run_bridge
+    # Um único transmissor, prazos com loop.call_at (sem espera ativa, pulando os atrasados),
+    # só as estatísticas no fim e sem reconexão. A escrita já não bloqueia o laço, então
+    # SERIAL_ASYNC_WRITE não se aplica.
+    if SERIAL_FLAG and len(SERIAL_TRANSMITTERS) > 1:
+        sys.exit("ERRO: ASYNC_BRIDGE suporta um único transmissor; use MULTIPROCESS_BRIDGE ou a ponte com threads.")
+    ignorados = [nome for nome, ativo in ((f"CONTROL_MODE = '{CONTROL_MODE}'", CONTROL_MODE != 'fixo'),
+                                          ('CONTROL_SPIN', CONTROL_SPIN > 0),
+                                          (f"CONTROL_OVERRUN = '{CONTROL_OVERRUN}'", CONTROL_OVERRUN != 'pular'),
+                                          ('LOG_LEVEL/LOG_RATE', LOG_LEVEL >= NIVEL_RESUMO),
+                                          ('LOG_BINARY', LOG_BINARY),
+                                          ('METRICS_ADDRESS', METRICS_ADDRESS),
+                                          ('SERIAL_RECONNECT', SERIAL_RECONNECT)) if ativo]
+    if ignorados:
+        print(f"AVISO: ignorados com ASYNC_BRIDGE: {', '.join(ignorados)}.")
+    porta, robos = SERIAL_TRANSMITTERS[0]
+    run_bridge(RECEIVER_PORT, porta if SERIAL_FLAG else None, SERIAL_BAUD_RATE,
+               CONTROL_FPS, inverter, telemetria=SERIAL_TELEMETRY, enquadrado=SERIAL_FRAMED,
+               gravacao=RECORD_FILE, robos=robos, vid_pid=SERIAL_VID_PID)
+    sys.exit(0)
+
+if MULTIPROCESS_BRIDGE:
+    from bridge_multiprocess import run_bridge_multiprocess
+    # O aviso do Receiver (on_update) não atravessa processos, e o log por tick fica no laço principal
+    if CONTROL_MODE != 'fixo':
+        print(f"AVISO: CONTROL_MODE = '{CONTROL_MODE}' não é suportado com MULTIPROCESS_BRIDGE; usando 'fixo'.")
+    if LOG_BINARY:
+        print("AVISO: LOG_BINARY não é gravado com MULTIPROCESS_BRIDGE; use RECORD_FILE.")
+    run_bridge_multiprocess(RECEIVER_PORT, SERIAL_TRANSMITTERS if SERIAL_FLAG else [], None, CONTROL_FPS, inverter,
+                            SERIAL_FRAMED, RECEIVER_MODE, RECEIVER_BATCH,
+                            LOG_RATE if LOG_LEVEL >= NIVEL_RESUMO else 0, CONTROL_SPIN, CONTROL_OVERRUN,
+                            RECORD_FILE, METRICS_ADDRESS, baudrate=SERIAL_BAUD_RATE,
+                            telemetria=SERIAL_TELEMETRY, escrita_assincrona=SERIAL_ASYNC_WRITE,
+                            reconectar=SERIAL_RECONNECT, vid_pid=SERIAL_VID_PID)
+    sys.exit(0)
+
+# Inicialização dos transmissores (um objeto serial e um escritor por porta)
+transmissores = None
 if SERIAL_FLAG:
-    comunicador = ComunicacaoSerial(SERIAL_PORT, SERIAL_BAUD_RATE)
+    transmissores = TransmissoresSerial(SERIAL_TRANSMITTERS, SERIAL_FRAMED, inverter, baudrate=SERIAL_BAUD_RATE,
+                                        telemetria=SERIAL_TELEMETRY, escrita_assincrona=SERIAL_ASYNC_WRITE,
+                                        reconectar=SERIAL_RECONNECT, vid_pid=SERIAL_VID_PID)
+    for (porta, _), ocupacao in zip(SERIAL_TRANSMITTERS, transmissores.ocupacao_banda(CONTROL_FPS)):
+        if ocupacao > 1:
+            print(f"AVISO: '{porta}' precisa de {ocupacao:.0%} do baud rate a {CONTROL_FPS} Hz; divida os robôs entre mais transmissores.")
+
+# Inicialização do recebimento das mensagens via socket
+receiver = Receiver(port=RECEIVER_PORT, logger=False, n_robots=TransmissoresSerial.n_robots(SERIAL_TRANSMITTERS))
+
+# Gravação da sessão para reprodução (antes de iniciar a thread, para não perder datagramas)
+if RECORD_FILE:
+    gravador = Gravador(RECORD_FILE)
+    atexit.register(gravador.fechar)
+    receiver.recorder = gravador
+    if transmissores:
+        for comunicador in transmissores.comunicadores:
+            comunicador.recorder = gravador
+
+receiver.start_thread(mode=RECEIVER_MODE, batch=RECEIVER_BATCH)
+
+# Montador do quadro quando não há serial (só para conferir os valores no log)
+montador = MontadorQuadro(inverter=inverter)
+
+# Ritmo do laço de controle: prazos absolutos ou encaminhamento a cada comando recebido
+if CONTROL_MODE == 'evento':
+    agendador = AgendadorEventos(CONTROL_MIN_GAP, 1 / CONTROL_FPS,
+                                 n_robos=receiver.n_robots if CONTROL_TEAM_UPDATE else None)
+    receiver.on_update = agendador.notificar
+else:
+    agendador = Agendador(CONTROL_FPS, espera_ativa=CONTROL_SPIN, politica=CONTROL_OVERRUN)
+
+# Registro das mensagens: o laço só enfileira; a formatação roda em segundo plano a LOG_RATE
+LOG_ESTADO, LOG_QUADRO, LOG_TELEMETRIA = range(3)
+
+def formatar_estado(estado):
+    linhas = []
+    for id_robot, robot in enumerate(estado):
+        linhas.append(f"Robô  {id_robot}")
+        linhas.append(f"Frente direita:  {robot[FRONT_RIGHT]}")
+        linhas.append(f"Frente esquerda:  {robot[FRONT_LEFT]}")
+        linhas.append(f"Trás direita:  {robot[BACK_RIGHT]}")
+        linhas.append(f"Trás esquerda:  {robot[BACK_LEFT]}")
+        linhas.append(f"Kick speed: {robot[KICK]}\n")
+    return '\n'.join(linhas)
+
+def formatar_telemetria(valores):
+    # [id, v1, v2, v3, v4, latência, idade, amostras RTT, p50, p99, máx] ou só [id] sem dados
+    linhas = ["-" * 30]
+    if len(valores) == 1:
+        linhas.append(f"Aguardando dados do Robô {valores[0]}...")
+        return '\n'.join(linhas)
+    linhas.append(f"Últimos dados recebidos do Robô {valores[0]}:")
+    linhas.append(f"  - Velocidades: {list(valores[1:5])}")
+    linhas.append(f"  - Latência: {valores[5]:.4f} s")
+    linhas.append(f"  - Recebido há: {valores[6]:.2f} s")
+    if valores[7]:
+        linhas.append(f"  - RTT: p50 {valores[8]*1e3:.2f} ms, p99 {valores[9]*1e3:.2f} ms, máx {valores[10]*1e3:.2f} ms")
+    return '\n'.join(linhas)
+
+# Um registro LOG_QUADRO por tick com os quadros de todas as portas, na ordem de SERIAL_TRANSMITTERS
+quadros_por_porta = [len(valores) for valores in transmissores.ultimos_valores] if transmissores else []
+
+def formatar_quadros(valores):
+    partes = np.split(valores, np.cumsum(quadros_por_porta)[:-1]) if quadros_por_porta else [valores]
+    return ''.join(f"[DEBUG] Lista enviada: {parte.tolist()}\n" for parte in partes)
+
+if LOG_LEVEL not in (NIVEL_NADA, NIVEL_RESUMO, NIVEL_DETALHE):
+    raise ValueError(f"LOG_LEVEL desconhecido: {LOG_LEVEL!r}")
+log = RegistroAssincrono(LOG_LEVEL, LOG_RATE, LOG_BINARY)
+atexit.register(log.fechar)
+log.formatador(LOG_ESTADO, formatar_estado)
+log.formatador(LOG_QUADRO, formatar_quadros)
+log.formatador(LOG_TELEMETRIA, formatar_telemetria)
+
+# Métricas de saúde da ponte: lidas dos contadores existentes só quando o endpoint é consultado
+if METRICS_ADDRESS:
+    metricas = Metricas()
+    metricas.receiver(receiver)
+    metricas.agendador(agendador)
+    metricas.registro(log)
+    metricas.montadores(transmissores.montadores if transmissores else [montador])
+    if transmissores:
+        metricas.serial(transmissores.comunicadores)
+    try:
+        servidor_metricas = ServidorMetricas(metricas, METRICS_ADDRESS)
+        print(f"Métricas em {METRICS_ADDRESS}")
+    except OSError as e:
+        print(f"AVISO: endpoint de métricas desativado ({e}).")
 
 while True:
-    t1 = time.time()
-
-    receiver.receive_socket()
-    # Acesso das variáveis obtidas pela rede em cada um dos robôs [0, 1 e 2]
-    for robot in receiver.robots:
-        print("Robô ", robot.id_robot)
-        print("Frente direita: ", robot.wheel_velocity_front_right)
-        print("Frente esquerda: ", robot.wheel_velocity_front_left)
-        print("Trás direita: ", robot.wheel_velocity_back_right)
-        print("Trás esquerda: ", robot.wheel_velocity_back_left)
-        print(f"Kick speed: {robot.kick_speed}\n")
+    # Retrato consistente dos comandos de todos os robôs [0, 1 e 2]
+    estado = receiver.state.snapshot()
+    log.registrar(NIVEL_DETALHE, LOG_ESTADO, estado)
 
     # Caso a interface com o teclado não esteja pronta ainda, descomente as linhas abaixo
     # Elas possuem casos padrão para testes básicos de validação.
 
     # Robô 0 a 0.5m/s pra frente - descomentar as próximas 5 linhas
-    robot0 = receiver.robots[0]
-    #robot0.wheel_velocity_front_right = 0
-    #robot0.wheel_velocity_front_left = 0
-    # robot0.wheel_velocity_back_right = 0
-    #robot0.wheel_velocity_back_left = 0
+    robot0 = estado[0]
+    #robot0[FRONT_RIGHT] = 0
+    #robot0[FRONT_LEFT] = 0
+    # robot0[BACK_RIGHT] = 0
+    #robot0[BACK_LEFT] = 0
 
     # Robô 1 a 0.5m/s pra cima - descomentar as próximas 5 linhas
-    robot1 = receiver.robots[1]
-    # robot1.wheel_velocity_front_right = 9.25926
-    # robot1.wheel_velocity_front_left = 9.259256
-    # robot1.wheel_velocity_back_right = -13.09457
-    # robot1.wheel_velocity_back_left = -13.09457
+    robot1 = estado[1]
+    # robot1[FRONT_RIGHT] = 9.25926
+    # robot1[FRONT_LEFT] = 9.259256
+    # robot1[BACK_RIGHT] = -13.09457
+    # robot1[BACK_LEFT] = -13.09457
 
     # Robô 2 a 1 rad/s (apenas girando) - descomentar as próximas 5 linhas
-    robot2 = receiver.robots[2]
-    # robot2.wheel_velocity_front_right = -16.03751
-    # robot2.wheel_velocity_front_left = 16.03751
-    # robot2.wheel_velocity_back_right = -13.09457
-    # robot2.wheel_velocity_back_left = -13.09457
+    robot2 = estado[2]
+    # robot2[FRONT_RIGHT] = -16.03751
+    # robot2[FRONT_LEFT] = 16.03751
+    # robot2[BACK_RIGHT] = -13.09457
+    # robot2[BACK_LEFT] = -13.09457
 
     # Mensagem a ser enviada - Padrão 1
     # Velocidades das rodas  (1,2,3,4) dos robos (1,2,3) (Roda 1 robo1, Roda 2 robo 1, Roda 3 Robo 1 ... )
     # Padrão software: (1,2,3,4)
     # Padrão Eletrônica: (4,3,2,1)
-    
-    def kicker_bit(r): # Se o kicker estiver ativo, retorna 1, senão 0
-        return 1 if getattr(r, 'kick_speed', 0) != 0 else 0
-
     # Robô 2 é o atacante no software, mas Robô 0 para eletrônica
-    # ...
-    
-    valores_para_enviar = [
-        inverter * int(robot2.wheel_velocity_front_left * CONV_RAD_HZ),
-        inverter * int(robot2.wheel_velocity_back_left * CONV_RAD_HZ),
-        inverter * int(robot2.wheel_velocity_back_right * CONV_RAD_HZ),
-        inverter * int(robot2.wheel_velocity_front_right * CONV_RAD_HZ),
-        kicker_bit(robot2),
-
-        inverter * int(robot1.wheel_velocity_front_left * CONV_RAD_HZ),
-        inverter * int(robot1.wheel_velocity_back_left * CONV_RAD_HZ),
-        inverter * int(robot1.wheel_velocity_back_right * CONV_RAD_HZ),
-        inverter * int(robot1.wheel_velocity_front_right * CONV_RAD_HZ),
-        kicker_bit(robot1),
-
-        inverter * int(robot0.wheel_velocity_front_left * CONV_RAD_HZ),
-        inverter * int(robot0.wheel_velocity_back_left * CONV_RAD_HZ),
-        inverter * int(robot0.wheel_velocity_back_right * CONV_RAD_HZ),
-        inverter * int(robot0.wheel_velocity_front_right * CONV_RAD_HZ),
-        kicker_bit(robot0),
-    ]
-    
-    print(f"[DEBUG] Lista enviada: {valores_para_enviar}\n")
-
-    formato = f'<{len(valores_para_enviar)}i'  # 15 inteiros
-    comando_em_bytes = struct.pack(formato, *valores_para_enviar)
-    
-    if comunicador:
+    if transmissores:
     
-        # Envia o comando em formato de bytes
-        comunicador.enviar_comando(comando_em_bytes)
+        # Monta e envia o quadro de cada transmissor; as portas são escritas em paralelo
+        transmissores.enviar(estado)
+        if log.nivel >= NIVEL_DETALHE:
+            log.registrar(NIVEL_DETALHE, LOG_QUADRO, np.concatenate(transmissores.ultimos_valores))
         
         # Valores recebidos da eletrônica
         id_robo_alvo = 1
-        dados_atuais = comunicador.get_dados(id_robo_alvo)
-                
-        print("-" * 30)
-        if dados_atuais:
-            print(f"Últimos dados recebidos do Robô {id_robo_alvo}:")
-            print(f"  - Velocidades: {dados_atuais['velocidades']}")
-            print(f"  - Latência: {dados_atuais['latencia']:.4f} s")
-            print(f"  - Recebido há: {time.time() - dados_atuais['timestamp']:.2f} s")
-        else:
-            print(f"Aguardando dados do Robô {id_robo_alvo}...")
-
-    t2 = time.time()
-
-    if (1/CONTROL_FPS - (t2-t1) > 0):
-        time.sleep(1/CONTROL_FPS - (t2-t1))
+        if log.nivel >= NIVEL_RESUMO:
+            dados_atuais = transmissores.get_dados(id_robo_alvo)
+            if dados_atuais:
+                rtt = transmissores.estatisticas_rtt(id_robo_alvo)
+                log.registrar(NIVEL_RESUMO, LOG_TELEMETRIA,
+                              [id_robo_alvo, *dados_atuais['velocidades'], dados_atuais['latencia'],
+                               time.time() - dados_atuais['timestamp'],
+                               rtt['amostras'], rtt['p50'], rtt['p99'], rtt['max']])
+            else:
+                log.registrar(NIVEL_RESUMO, LOG_TELEMETRIA, [id_robo_alvo])
+
+    else:
+        log.registrar(NIVEL_DETALHE, LOG_QUADRO, montador.montar(estado).copy())
+
+    agendador.esperar()
@@ -0,0 +1,221 @@
+import os
+import socketserver
+import threading
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICAS_ENDERECO = ('127.0.0.1', 9108)    # Endereço padrão do endpoint HTTP
+QUANTIS = (0.5, 0.99, 1.0)                  # Quantis exportados nos resumos (1.0 é o máximo)
+
+# ---------------------------------------------------------------------------------------------
+#    COLETA DAS MÉTRICAS
+# ---------------------------------------------------------------------------------------------
+
+class Metricas:
+    """
+    Descrição:
+        Exporta no formato texto do Prometheus os contadores que a ponte já mantém. Nada é
+        registrado no caminho quente: cada coletor lê os contadores e janelas existentes
+        (Receiver.get_stats, Agendador.janela_jitter, EscritorSerial.get_stats, ...) só quando o
+        endpoint é consultado, então a coleta pode ficar sempre ligada.
+        Um coletor é uma função sem argumentos que retorna uma lista de famílias
+        (nome, tipo, ajuda, [(rótulos, valor), ...]).
+    """
+    def __init__(self):
+        self._coletores = []
+
+    def adicionar(self, coletor):
+        self._coletores.append(coletor)
+
+    def receiver(self, receiver):
+        """Datagramas recebidos, decodificados e com erro, e disparos do watchdog por robô."""
+        def coletar():
+            stats = receiver.get_stats()
+            return [
+                ('bridge_receiver_datagrams_total', 'counter', 'Datagramas UDP recebidos',
+                 [({}, stats['datagrams_received'])]),
+                ('bridge_receiver_decoded_total', 'counter', 'Datagramas decodificados, por caminho',
+                 [({'path': 'fast'}, stats['fast_path_packets']),
+                  ({'path': 'protobuf'}, stats['fallback_packets'] - stats['decode_errors'])]),
+                ('bridge_receiver_decode_errors_total', 'counter', 'Datagramas que não puderam ser decodificados',
+                 [({}, stats['decode_errors'])]),
+                ('bridge_receiver_commands_coalesced_total', 'counter', 'Comandos substituídos dentro de um lote',
+                 [({}, stats['commands_coalesced'])]),
+                ('bridge_watchdog_trips_total', 'counter', 'Vezes em que o watchdog zerou as saídas do robô',
+                 [({'robot': str(id_robot)}, int(trips)) for id_robot, trips in enumerate(receiver.watchdog_trips)]),
+            ]
+        self.adicionar(coletar)
+
+    def agendador(self, agendador):
+        """Ticks do laço de controle, atraso em relação ao prazo (jitter) e duração do trabalho."""
+        def coletar():
+            familias = [
+                ('bridge_tick_total', 'counter', 'Ticks do laço de controle', [({}, agendador.ticks)]),
+                _resumo('bridge_tick_jitter_seconds', 'Atraso do despertar em relação ao prazo (ou ao aviso do Receiver)',
+                        *agendador.janela_jitter(), agendador.atraso_total),
+                _resumo('bridge_tick_duration_seconds', 'Trabalho feito em cada tick',
+                        *agendador.janela_duracao(), agendador.duracao_total),
+            ]
+            if hasattr(agendador, 'ticks_atrasados'):
+                familias.append(('bridge_tick_late_total', 'counter', 'Ticks que começaram depois do prazo',
+                                 [({}, agendador.ticks_atrasados)]))
+                familias.append(('bridge_tick_skipped_total', 'counter', 'Prazos descartados pela política pular',
+                                 [({}, agendador.ticks_perdidos)]))
+            else:
+                familias.append(('bridge_tick_keepalive_total', 'counter', 'Ticks sem comando novo (keepalive)',
+                                 [({}, agendador.ticks_keepalive)]))
+            return familias
+        self.adicionar(coletar)
+
+    def montadores(self, montadores):
+        """Robôs zerados no quadro por valores não finitos, por transmissor (rótulo frame)."""
+        def coletar():
+            return [
+                ('bridge_frame_invalid_robots_total', 'counter',
+                 'Robôs enviados zerados por velocidades NaN ou infinitas',
+                 [({'frame': str(indice)}, montador.robos_invalidos) for indice, montador in enumerate(montadores)]),
+            ]
+        self.adicionar(coletar)
+
+    def serial(self, comunicadores):
+        """Escrita e telemetria de cada ComunicacaoSerial (rótulo port)."""
+        def coletar():
+            amostras = {}
+            for comunicador in comunicadores:
+                rotulos = {'port': str(comunicador.porta)}
+                escrita = comunicador.get_stats_escrita()
+                conexao = comunicador.get_stats_conexao()
+                for nome, valor in (('bytes', escrita['bytes_escritos']),
+                                    ('frames', escrita['quadros_escritos']),
+                                    ('overwritten', escrita['quadros_sobrescritos']),
+                                    ('stalls', escrita['escritas_lentas']),
+                                    ('errors', escrita['erros_escrita']),
+                                    ('dropped', conexao['quadros_descartados']),
+                                    ('connected', int(conexao['conectado'])),
+                                    ('disconnects', conexao['desconexoes']),
+                                    ('telemetry', comunicador.quadros_telemetria),
+                                    ('telemetry_errors', comunicador.erros_telemetria)):
+                    amostras.setdefault(nome, []).append((rotulos, valor))
+            if not amostras:
+                return []
+            return [
+                ('bridge_serial_bytes_written_total', 'counter', 'Bytes escritos na serial', amostras['bytes']),
+                ('bridge_serial_frames_written_total', 'counter', 'Quadros escritos na serial', amostras['frames']),
+                ('bridge_serial_frames_overwritten_total', 'counter',
+                 'Quadros substituídos antes de serem escritos (escritor atrasado)', amostras['overwritten']),
+                ('bridge_serial_write_stalls_total', 'counter', 'Escritas mais lentas que ESCRITA_LENTA',
+                 amostras['stalls']),
+                ('bridge_serial_write_errors_total', 'counter', 'Escritas com erro', amostras['errors']),
+                ('bridge_serial_frames_dropped_total', 'counter', 'Quadros descartados sem conexão',
+                 amostras['dropped']),
+                ('bridge_serial_connected', 'gauge', '1 se a porta está aberta', amostras['connected']),
+                ('bridge_serial_disconnects_total', 'counter', 'Desconexões da porta', amostras['disconnects']),
+                ('bridge_telemetry_messages_total', 'counter', 'Mensagens de telemetria interpretadas',
+                 amostras['telemetry']),
+                ('bridge_telemetry_parse_errors_total', 'counter', 'Linhas ou quadros de telemetria inválidos',
+                 amostras['telemetry_errors']),
+            ]
+        self.adicionar(coletar)
+
+    def registro(self, log):
+        """Registros do RegistroAssincrono e os perdidos com a fila cheia."""
+        def coletar():
+            return [
+                ('bridge_log_records_total', 'counter', 'Registros enfileirados pelo laço', [({}, log.registros)]),
+                ('bridge_log_dropped_total', 'counter', 'Registros perdidos com a fila cheia',
+                 [({}, log.descartados)]),
+            ]
+        self.adicionar(coletar)
+
+    def texto(self):
+        """Retorna todas as métricas no formato texto do Prometheus (versão 0.0.4)."""
+        linhas = []
+        for coletor in self._coletores:
+            for nome, tipo, ajuda, amostras in coletor():
+                linhas.append(f"# HELP {nome} {ajuda}")
+                linhas.append(f"# TYPE {nome} {tipo}")
+                for rotulos, valor in amostras:
+                    sufixo = rotulos.get('__sufixo', '')
+                    linhas.append(f"{nome}{sufixo}{_rotulos(rotulos)} {_valor(valor)}")
+        linhas.append('')
+        return '\n'.join(linhas)
+
+def _resumo(nome, ajuda, janela, n, soma):
+    """
+    Família 'summary' com os QUANTIS dos valores válidos de uma janela circular (n já escritos)
+    e, como manda o formato, a soma e a contagem de todos os valores desde o início.
+    """
+    valores = janela[:min(n, len(janela))]
+    amostras = []
+    if valores.size:
+        for quantil, valor in zip(QUANTIS, np.quantile(valores, QUANTIS)):
+            amostras.append(({'quantile': str(quantil)}, float(valor)))
+    amostras.append(({'__sufixo': '_sum'}, float(soma)))
+    amostras.append(({'__sufixo': '_count'}, n))
+    return nome, 'summary', f"{ajuda} (s, últimos {len(janela)} ticks)", amostras
+
+def _rotulos(rotulos):
+    rotulos = {chave: valor for chave, valor in rotulos.items() if chave != '__sufixo'}
+    if not rotulos:
+        return ''
+    texto = ','.join(f'{chave}="{_escapar(valor)}"' for chave, valor in rotulos.items())
+    return '{' + texto + '}'
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _valor(valor):
+    if isinstance(valor, float):
+        return repr(valor) if valor == valor else 'NaN'
+    return str(valor)
+
+# ---------------------------------------------------------------------------------------------
+#    ENDPOINT
+# ---------------------------------------------------------------------------------------------
+
+class _Manipulador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        corpo = self.server.metricas.texto().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass        # Sem prints a cada consulta
+
+class _ServidorUnix(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class ServidorMetricas:
+    """
+    Descrição:
+        Serve Metricas.texto() em GET /metrics em uma thread daemon.
+    Entradas:
+        metricas:   Instância de Metricas
+        endereco:   (ip, porta) para HTTP via TCP, ou caminho de um socket UNIX
+                    (consulta: curl --unix-socket CAMINHO http://localhost/metrics)
+    """
+    def __init__(self, metricas, endereco=METRICAS_ENDERECO):
+        self.endereco = endereco
+        if isinstance(endereco, str):
+            if os.path.exists(endereco):
+                os.unlink(endereco)
+            self.servidor = _ServidorUnix(endereco, _Manipulador)
+        else:
+            self.servidor = ThreadingHTTPServer(tuple(endereco), _Manipulador)
+            self.servidor.daemon_threads = True
+        self.servidor.metricas = metricas
+
+        self.thread = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self.thread.start()
+
+    def fechar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+        if isinstance(self.endereco, str) and os.path.exists(self.endereco):
+            os.unlink(self.endereco)
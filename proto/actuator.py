@@ -94,17 +94,25 @@ class Actuator():
 
         # Crie uma mensagem RobotControl
         robot_control = RobotControl()
+        self._add_wheel_command(robot_control, index, wheel_bl, wheel_br, wheel_fl, wheel_fr, kick)
+            
+        self.send_socket(robot_control.SerializeToString())
 
+    def _add_wheel_command(self, robot_control, index, wheel_bl, wheel_br, wheel_fl, wheel_fr, kick):
+        '''
+        Descrição:  
+                Adiciona à mensagem RobotControl um RobotCommand com as velocidades das rodas
+        '''
         #Crie uma mensagem RobotCommand
         robot_command = robot_control.robot_commands.add()
-        robot_command.id = self.robot_id
+        robot_command.id = index
 
         #Crie uma mensagem MoveWheelVelocity
         move_command = MoveWheelVelocity()
-        move_command.front_right = self.wheel_fr
-        move_command.back_right = self.wheel_fl
-        move_command.back_left = self.wheel_br
-        move_command.front_left = self.wheel_bl
+        move_command.front_right = wheel_fr
+        move_command.back_right = wheel_fl
+        move_command.back_left = wheel_br
+        move_command.front_left = wheel_bl
         
 
         # Atribua a mensagem MoveWheelVelocity ao campo move_command da mensagem RobotCommand
@@ -112,8 +120,6 @@ class Actuator():
         
         if kick > 0:
             robot_command.kick_speed = 1.0  # valor binário (1)
-            
-        self.send_socket(robot_control.SerializeToString())
         
 
     def send_globalVelocity_message(self, robot,velocity_x, velocity_y, angular):
@@ -160,6 +166,32 @@ class Actuator():
         Descrição:  
                 Método responsável pelo envio da velocidade local do robô
         '''
+        dw1, dw2, dw3, dw4 = self._local_to_wheels(vx_local, vy_local, angular)
+
+        # Por algum motivo os motores precisam ir de 4 até 1... 
+        # O simulador inverteu os motores
+        self.send_wheelVelocity_message(robot_id, dw4, dw3, dw2, dw1, kick)
+
+    def send_team_localVelocity_message(self, commands):
+        '''
+        Descrição:  
+                Método responsável pelo envio da velocidade local de vários robôs em um único
+                datagrama RobotControl
+        Entradas:
+                commands:   Lista de tuplas (robot_id, vx_local, vy_local, angular, kick)
+        '''
+        robot_control = RobotControl()
+        for robot_id, vx_local, vy_local, angular, kick in commands:
+            dw1, dw2, dw3, dw4 = self._local_to_wheels(vx_local, vy_local, angular)
+            self._add_wheel_command(robot_control, robot_id, dw4, dw3, dw2, dw1, kick)
+
+        self.send_socket(robot_control.SerializeToString())
+
+    def _local_to_wheels(self, vx_local, vy_local, angular):
+        '''
+        Descrição:  
+                Converte a velocidade local do robô nas velocidades das rodas (1, 2, 3, 4)
+        '''
         wheel_radius = 0.09
         robot_radius = 0.027
         phi1 = 60 * np.pi/180
@@ -167,13 +199,6 @@ class Actuator():
         phi3 = 225 * np.pi/180
         phi4 = 300 * np.pi/180
 
-        # Crie uma mensagem RobotControl
-        robot_control = RobotControl()
-
-        #Crie uma mensagem RobotCommand
-        robot_command = robot_control.robot_commands.add()
-        robot_command.id = robot_id
-
         # Transformação do vetor local de velocidades do robô para as rodas
         # Fonte: grSim/src/robot.cpp
         dw1 =  (1.0 / wheel_radius) * (( (robot_radius * angular) - (vx_local * np.sin(phi1)) + (vy_local * np.cos(phi1))) )
@@ -181,9 +206,7 @@ class Actuator():
         dw3 =  (1.0 / wheel_radius) * (( (robot_radius * angular) - (vx_local * np.sin(phi3)) + (vy_local * np.cos(phi3))) )
         dw4 =  (1.0 / wheel_radius) * (( (robot_radius * angular) - (vx_local * np.sin(phi4)) + (vy_local * np.cos(phi4))) )
 
-        # Por algum motivo os motores precisam ir de 4 até 1... 
-        # O simulador inverteu os motores
-        self.send_wheelVelocity_message(robot_id, dw4, dw3, dw2, dw1, kick)
+        return dw1, dw2, dw3, dw4
     
     def send_wheel_from_global(self, robot, velocity_x, velocity_y, angular):
         '''
@@ -0,0 +1,289 @@
+"""
+Gravação e reprodução do tráfego da ponte: datagramas UDP recebidos, quadros de comando
+enviados ao STM e bytes de telemetria lidos da serial, cada um com o instante monotônico.
+
+O log é binário e só cresce (append): uma assinatura seguida de registros
+    tipo (u8) | instante time.monotonic() (f64) | tamanho (u32) | dados
+todos little-endian. A reprodução lê o arquivo por mmap, sem copiar os dados, em tempo real
+(ou em outra velocidade) ou o mais rápido possível; neste último caso serve também de
+benchmark de vazão da decodificação.
+
+A reprodução alimenta um Receiver com os datagramas e, a cada quadro gravado, remonta com
+MontadorQuadro/CodificadorComando o quadro que a ponte atual enviaria naquele ponto e o
+compara com o gravado.
+
+Uso:
+    python recorder.py info LOG
+    python recorder.py replay LOG [--speed 1.0 | --max-speed] [--telemetria csv|binaria]
+                                  [--quadro 2,1,0 ...] [--inverter -1] [--enquadrado]
+"""
+import os
+import tty
+import mmap
+import time
+import struct
+import argparse
+import threading
+import collections
+
+REG_DATAGRAMA, REG_QUADRO, REG_TELEMETRIA = 1, 2, 3
+NOMES_REGISTRO = {REG_DATAGRAMA: 'datagramas', REG_QUADRO: 'quadros', REG_TELEMETRIA: 'telemetria'}
+REG_CABECALHO = struct.Struct('<BdI')
+ASSINATURA = b'RDLOG1\n\x00'
+COMPARACAO_HISTORICO = 8     # Estados anteriores aceitos ao comparar um quadro gravado (ver ComparadorQuadros)
+
+# ---------------------------------------------------------------------------------------------
+#    GRAVAÇÃO
+# ---------------------------------------------------------------------------------------------
+
+class Gravador:
+    """
+    Descrição:
+        Acrescenta registros ao log. Pode ser chamado ao mesmo tempo pela thread do Receiver,
+        pelo laço de controle e pela leitura da serial; a escrita passa por um buffer, então
+        o custo no caminho quente é o de copiar os bytes para a memória.
+        Ligue em Receiver.recorder e ComunicacaoSerial.recorder.
+    Entradas:
+        caminho:    Arquivo do log (criado se não existir; se existir, os registros são
+                    acrescentados ao final)
+        buffer:     Tamanho (bytes) do buffer de escrita
+    """
+    def __init__(self, caminho, buffer=1 << 16):
+        novo = not os.path.exists(caminho) or os.path.getsize(caminho) == 0
+        self._arquivo = open(caminho, 'ab', buffering=buffer)
+        if novo:
+            self._arquivo.write(ASSINATURA)
+        self._lock = threading.Lock()
+        self.registros = 0
+        self.bytes = 0
+
+    def gravar(self, tipo, dados):
+        cabecalho = REG_CABECALHO.pack(tipo, time.monotonic(), len(dados))
+        with self._lock:
+            self._arquivo.write(cabecalho)
+            self._arquivo.write(dados)
+            self.registros += 1
+            self.bytes += REG_CABECALHO.size + len(dados)
+
+    def datagrama(self, dados):
+        self.gravar(REG_DATAGRAMA, dados)
+
+    def quadro(self, dados):
+        self.gravar(REG_QUADRO, dados)
+
+    def telemetria(self, dados):
+        self.gravar(REG_TELEMETRIA, dados)
+
+    def fechar(self):
+        with self._lock:
+            self._arquivo.close()
+
+# ---------------------------------------------------------------------------------------------
+#    REPRODUÇÃO
+# ---------------------------------------------------------------------------------------------
+
+class Reprodutor:
+    """
+    Descrição:
+        Lê um log do Gravador por mmap. Os dados de cada registro são memoryviews do
+        arquivo mapeado, válidos até fechar().
+    Entradas:
+        caminho:    Arquivo do log
+    """
+    def __init__(self, caminho):
+        self._arquivo = open(caminho, 'rb')
+        tamanho = os.fstat(self._arquivo.fileno()).st_size
+        if tamanho < len(ASSINATURA):
+            self._arquivo.close()
+            raise ValueError(f"'{caminho}' não é um log da ponte (arquivo vazio ou truncado).")
+        self._mmap = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        if self._view[:len(ASSINATURA)] != ASSINATURA:
+            self.fechar()
+            raise ValueError(f"'{caminho}' não é um log da ponte.")
+
+    def __iter__(self):
+        """Gera (tipo, instante, dados) de cada registro completo, na ordem gravada."""
+        view = self._view
+        fim = len(view)
+        pos = len(ASSINATURA)
+        while pos + REG_CABECALHO.size <= fim:
+            tipo, instante, tamanho = REG_CABECALHO.unpack_from(view, pos)
+            pos += REG_CABECALHO.size
+            if pos + tamanho > fim:
+                break       # Registro incompleto no fim do arquivo (gravação interrompida)
+            yield tipo, instante, view[pos:pos + tamanho]
+            pos += tamanho
+
+    def resumo(self):
+        """Retorna a contagem e os bytes por tipo e a duração (s) do log."""
+        contagem = {tipo: 0 for tipo in NOMES_REGISTRO}
+        total = {tipo: 0 for tipo in NOMES_REGISTRO}
+        primeiro = ultimo = None
+        for tipo, instante, dados in self:
+            contagem[tipo] = contagem.get(tipo, 0) + 1
+            total[tipo] = total.get(tipo, 0) + len(dados)
+            if primeiro is None:
+                primeiro = instante
+            ultimo = instante
+        return {'registros': contagem, 'bytes': total,
+                'duracao': (ultimo - primeiro) if primeiro is not None else 0.0}
+
+    def reproduzir(self, ao_datagrama=None, ao_quadro=None, ao_telemetria=None, velocidade=1.0):
+        """
+        Descrição:
+            Entrega cada registro à função do seu tipo, respeitando os intervalos gravados.
+        Entradas:
+            ao_datagrama:   Ex.: Receiver.process_datagram ou ComparadorQuadros.datagrama
+            ao_quadro:      Função para os quadros enviados (ex.: ComparadorQuadros)
+            ao_telemetria:  Ex.: ComunicacaoSerial._receber_bytes
+            velocidade:     1.0 em tempo real, 2.0 no dobro etc.; 0 ou None o mais rápido possível
+        Retorna:
+            Dicionário com os registros entregues, a duração (s) da reprodução e a taxa (registros/s).
+        """
+        destinos = {REG_DATAGRAMA: ao_datagrama, REG_QUADRO: ao_quadro, REG_TELEMETRIA: ao_telemetria}
+        entregues = 0
+        inicio = time.perf_counter()
+        origem = None
+        for tipo, instante, dados in self:
+            destino = destinos.get(tipo)
+            if destino is None:
+                continue
+            if velocidade:
+                if origem is None:
+                    origem = instante
+                espera = inicio + (instante - origem) / velocidade - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+            destino(dados)
+            entregues += 1
+
+        duracao = time.perf_counter() - inicio
+        return {'entregues': entregues, 'duracao': duracao,
+                'taxa': entregues / duracao if duracao > 0 else 0.0}
+
+    def fechar(self):
+        self._view.release()
+        self._mmap.close()
+        self._arquivo.close()
+
+class ComparadorQuadros:
+    """
+    Descrição:
+        Destino dos quadros gravados na reprodução (ao_quadro). A cada quadro gravado monta,
+        com o estado do Receiver naquele ponto da reprodução, o quadro que a ponte atual
+        enviaria (MontadorQuadro + CodificadorComando) e o compara byte a byte com o gravado.
+        No modo enquadrado a sequência é copiada do quadro gravado, para que só o conteúdo
+        seja comparado.
+        Os quadros são gravados depois de escritos e os datagramas antes de publicados, em
+        threads diferentes, então o quadro pode aparecer no log depois de datagramas que ele
+        não viu, e as portas com EscritorSerial podem gravar fora de ordem. Por isso os
+        datagramas passam por datagrama() (ao_datagrama), que guarda os últimos
+        COMPARACAO_HISTORICO estados, e cada quadro é comparado com todas as portas: um quadro
+        igual ao de um estado anterior conta em atrasados, não em diferentes.
+    Entradas:
+        receiver:   Receiver alimentado com os datagramas da reprodução
+        grupos:     Robôs de cada transmissor, na ordem em que entram no quadro
+        inverter:   -1 para inverter o sentido dos motores, 1 caso contrário
+        enquadrado: Quadros com sincronismo, sequência e CRC
+    """
+    def __init__(self, receiver, grupos=((2, 1, 0),), inverter=-1, enquadrado=False):
+        from communicators import MontadorQuadro, CodificadorComando, COMANDO_SYNC
+
+        self.receiver = receiver
+        self.montadores = [MontadorQuadro(robos, inverter=inverter) for robos in grupos]
+        self.codificadores = [CodificadorComando(montador.n_valores, enquadrado) for montador in self.montadores]
+        self._seq = struct.Struct('<H')
+        self._pos_seq = len(COMANDO_SYNC)
+        self._anteriores = collections.deque(maxlen=COMPARACAO_HISTORICO)   # Mais recente primeiro
+
+        self.quadros = 0
+        self.atrasados = 0                  # Iguais ao quadro montado sem os últimos datagramas
+        self.diferentes = 0
+        self.primeira_diferenca = None      # Índice do primeiro quadro diferente
+
+    def datagrama(self, dados):
+        self._anteriores.appendleft(self.receiver.state.snapshot())
+        self.receiver.process_datagram(dados)
+
+    def __call__(self, dados):
+        self.quadros += 1
+        self.receiver._check_watchdog()
+        if self._algum_igual(self.receiver.state.snapshot(), dados):
+            return
+        if any(self._algum_igual(estado, dados) for estado in self._anteriores):
+            self.atrasados += 1
+            return
+        self.diferentes += 1
+        if self.primeira_diferenca is None:
+            self.primeira_diferenca = self.quadros - 1
+
+    def _algum_igual(self, estado, gravado):
+        """Verifica se o quadro gravado é o de alguma das portas para o estado."""
+        for montador, codificador in zip(self.montadores, self.codificadores):
+            if codificador.tamanho != len(gravado):
+                continue
+            if codificador.enquadrado:
+                codificador.seq = (self._seq.unpack_from(gravado, self._pos_seq)[0] - 1) & 0xFFFF
+            if codificador.codificar(montador.montar(estado)) == gravado:
+                return True
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='comando', required=True)
+    info = sub.add_parser('info', help='Resumo do log')
+    info.add_argument('log')
+    replay = sub.add_parser('replay', help='Reproduz o log contra um Receiver e o parser de telemetria')
+    replay.add_argument('log')
+    replay.add_argument('--speed', type=float, default=1.0, help='Velocidade da reprodução')
+    replay.add_argument('--max-speed', action='store_true', help='Reproduz o mais rápido possível')
+    replay.add_argument('--telemetria', choices=('csv', 'binaria'), default='csv')
+    replay.add_argument('--robots', type=int, default=3)
+    replay.add_argument('--quadro', action='append', default=None,
+                        help='Robôs de um transmissor na ordem do quadro (ex.: 2,1,0); repita para cada porta')
+    replay.add_argument('--inverter', type=int, choices=(-1, 1), default=-1)
+    replay.add_argument('--enquadrado', action='store_true', help='Quadros com sincronismo, sequência e CRC')
+    args = parser.parse_args()
+
+    reprodutor = Reprodutor(args.log)
+    if args.comando == 'info':
+        resumo = reprodutor.resumo()
+        print(f"Duração: {resumo['duracao']:.2f} s")
+        for tipo, nome in NOMES_REGISTRO.items():
+            print(f"  {nome:>10}: {resumo['registros'][tipo]:>8} registros, {resumo['bytes'][tipo]:>10} bytes")
+        reprodutor.fechar()
+        return
+
+    from communicators import Receiver, ComunicacaoSerial
+
+    # A ponte sem rede nem placa: o Receiver não recebe nada pela porta efêmera e a
+    # telemetria é interpretada por um ComunicacaoSerial aberto em um pty
+    receiver = Receiver(port=0, n_robots=args.robots)
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    comunicador = ComunicacaoSerial(os.ttyname(slave), iniciar_leitura=False, telemetria=args.telemetria,
+                                    escrita_assincrona=False, reconectar=False)
+
+    grupos = [tuple(int(id_robo) for id_robo in grupo.split(',')) for grupo in (args.quadro or ['2,1,0'])]
+    comparador = ComparadorQuadros(receiver, grupos, args.inverter, args.enquadrado)
+
+    resultado = reprodutor.reproduzir(comparador.datagrama, comparador, comunicador._receber_bytes,
+                                      0 if args.max_speed else args.speed)
+    print(f"{resultado['entregues']} registros em {resultado['duracao']:.3f} s "
+          f"({resultado['taxa']:.0f} registros/s)")
+    print(f"Receiver: {receiver.get_stats()}")
+    texto = f", o primeiro é o {comparador.primeira_diferenca}" if comparador.diferentes else ""
+    print(f"Quadros: {comparador.quadros} remontados, {comparador.atrasados} sem os últimos datagramas, "
+          f"{comparador.diferentes} diferentes do gravado{texto}")
+    print(f"Telemetria: {comunicador.quadros_telemetria} mensagens, {comunicador.erros_telemetria} erros")
+
+    comunicador.fechar()
+    receiver.socket.close()
+    os.close(master)
+    os.close(slave)
+    reprodutor.fechar()
+
+
+if __name__ == '__main__':
+    main()
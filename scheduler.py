@@ -0,0 +1,250 @@
+import time
+import threading
+import numpy as np
+
+JITTER_WINDOW = 4096        # Quantidade de ticks guardados para as estatísticas de jitter
+ESPERA_ATIVA = 0.0005       # Tempo (s) antes do prazo em que o sleep dá lugar à espera ativa
+
+# ---------------------------------------------------------------------------------------------
+#    AGENDADOR DE TAXA FIXA POR PRAZOS ABSOLUTOS
+# ---------------------------------------------------------------------------------------------
+
+class Agendador:
+    """
+    Descrição:
+        Marca o ritmo de um laço a uma taxa fixa. Os prazos são absolutos (time.perf_counter_ns,
+        monotônico e imune a ajustes do relógio), então o tempo gasto no tick e o excesso do
+        sleep não se acumulam. Até `espera_ativa` antes do prazo o agendador dorme; o restante
+        é feito em espera ativa, trocando um pouco de CPU por precisão.
+    Entradas:
+        frequencia:     Ticks por segundo
+        espera_ativa:   Tempo (s) final de cada espera feito em espera ativa (0 desativa)
+        politica:       O que fazer quando um tick passa de um período inteiro:
+                        'pular' descarta os prazos perdidos e volta ao ritmo no próximo;
+                        'recuperar' executa os ticks atrasados em sequência até alcançar.
+    """
+    def __init__(self, frequencia, espera_ativa=ESPERA_ATIVA, politica='pular'):
+        if politica not in ('pular', 'recuperar'):
+            raise ValueError(f"Política de atraso desconhecida: '{politica}'")
+
+        self.periodo_ns = round(1e9 / frequencia)
+        self.espera_ativa_ns = round(espera_ativa * 1e9)
+        self.politica = politica
+
+        self._proximo = None
+        self._despertar = None
+        self.ticks = 0
+        self.ticks_atrasados = 0    # Ticks que começaram depois do prazo
+        self.ticks_perdidos = 0     # Prazos descartados pela política 'pular'
+        self.atrasos = np.zeros(JITTER_WINDOW, dtype=np.float64)
+        self.duracoes = np.zeros(JITTER_WINDOW, dtype=np.float64)   # Trabalho de cada tick (s)
+        self.atraso_total = 0.0     # Somas desde o início (s), além da janela
+        self.duracao_total = 0.0
+
+    def esperar(self):
+        """
+        Descrição:
+            Bloqueia até o próximo prazo. A primeira chamada espera um período a partir dela.
+        Retorna:
+            Atraso (s) do despertar em relação ao prazo.
+        """
+        agora = time.perf_counter_ns()
+        if self._proximo is None:
+            self._proximo = agora + self.periodo_ns
+        else:
+            _registrar_duracao(self, agora)
+
+        restante = self._proximo - agora
+        if restante <= 0:
+            self.ticks_atrasados += 1
+            if self.politica == 'pular' and -restante >= self.periodo_ns:
+                perdidos = -restante // self.periodo_ns
+                self.ticks_perdidos += perdidos
+                self._proximo += perdidos * self.periodo_ns
+        else:
+            if restante > self.espera_ativa_ns:
+                time.sleep((restante - self.espera_ativa_ns) / 1e9)
+            while time.perf_counter_ns() < self._proximo:
+                pass
+
+        self._despertar = time.perf_counter_ns()
+        atraso = (self._despertar - self._proximo) / 1e9
+        self.atrasos[self.ticks % JITTER_WINDOW] = atraso
+        self.atraso_total += atraso
+        self.ticks += 1
+        self._proximo += self.periodo_ns
+        return atraso
+
+    def estatisticas_jitter(self):
+        """
+        Retorna:
+            Dicionário com p50, p99 e máximo (s) do atraso de cada tick em relação ao prazo,
+            nos últimos JITTER_WINDOW ticks, além das contagens de ticks atrasados e perdidos.
+        """
+        return {
+            'ticks': self.ticks,
+            **resumo_janela(*self.janela_jitter()),
+            'atrasados': self.ticks_atrasados,
+            'perdidos': self.ticks_perdidos,
+        }
+
+    def estatisticas_duracao(self):
+        """Retorna p50, p99 e máximo (s) do trabalho feito entre dois ticks (ver _resumo_duracao)."""
+        return _resumo_duracao(self)
+
+    def janela_jitter(self):
+        """Retorna a janela circular dos atrasos e quantos atrasos já foram escritos nela (um por tick)."""
+        return self.atrasos, self.ticks
+
+    def janela_duracao(self):
+        """Retorna a janela circular das durações e quantas já foram escritas nela."""
+        return _janela_duracao(self)
+
+# ---------------------------------------------------------------------------------------------
+#    AGENDADOR POR EVENTOS (ENCAMINHAMENTO IMEDIATO)
+# ---------------------------------------------------------------------------------------------
+
+class AgendadorEventos:
+    """
+    Descrição:
+        Alternativa ao Agendador para encaminhar comandos assim que chegam. esperar() retorna
+        quando o Receiver avisa uma atualização (Receiver.on_update = notificar), respeitando
+        um intervalo mínimo entre quadros, ou quando passa `keepalive` sem atualizações, para
+        o STM continuar recebendo quadros com a entrada parada.
+    Entradas:
+        intervalo_minimo:   Intervalo (s) mínimo entre dois ticks; deve caber no baud rate
+                            da serial (60 bytes a 115200 bps levam ~5.2 ms)
+        keepalive:          Intervalo (s) máximo entre dois ticks
+        n_robos:            None dispara a cada pacote; um número dispara só quando todos
+                            os robôs 0 ... n_robos-1 foram atualizados desde o último tick
+    """
+    def __init__(self, intervalo_minimo=0.006, keepalive=1/60, n_robos=None):
+        self.intervalo_minimo_ns = round(intervalo_minimo * 1e9)
+        self.keepalive_ns = round(keepalive * 1e9)
+        self.n_robos = n_robos
+
+        self._evento = threading.Event()
+        self._lock = threading.Lock()
+        self._atualizados = set()
+        self._primeiro_aviso = None     # Instante (ns) do primeiro aviso desde o último tick
+        self._ultimo = None
+        self._despertar = None
+
+        self.ticks = 0
+        self.ticks_evento = 0
+        self.ticks_keepalive = 0
+        self.atrasos = np.zeros(JITTER_WINDOW, dtype=np.float64)
+        self.duracoes = np.zeros(JITTER_WINDOW, dtype=np.float64)
+        self.atraso_total = 0.0     # Somas desde o início (s), além da janela
+        self.duracao_total = 0.0
+
+    def notificar(self, ids):
+        """Chamado pela thread do Receiver com os ids dos robôs atualizados."""
+        with self._lock:
+            if self._primeiro_aviso is None:
+                self._primeiro_aviso = time.perf_counter_ns()
+            self._atualizados.update(ids)
+            if self.n_robos is None or len(self._atualizados) >= self.n_robos:
+                self._evento.set()
+
+    def esperar(self):
+        """
+        Descrição:
+            Bloqueia até a próxima atualização (após o intervalo mínimo) ou até o keepalive.
+        Retorna:
+            Atraso (s) entre o primeiro aviso e o tick, ou 0.0 em um tick de keepalive.
+        """
+        agora = time.perf_counter_ns()
+        if self._ultimo is None:
+            self._ultimo = agora
+        else:
+            _registrar_duracao(self, agora)
+
+        restante = self._ultimo + self.keepalive_ns - agora
+        disparou = self._evento.wait(max(0, restante) / 1e9)
+        if disparou:
+            folga = self._ultimo + self.intervalo_minimo_ns - time.perf_counter_ns()
+            if folga > 0:
+                time.sleep(folga / 1e9)
+            self.ticks_evento += 1
+        else:
+            self.ticks_keepalive += 1
+
+        with self._lock:
+            self._evento.clear()
+            self._atualizados.clear()
+            primeiro, self._primeiro_aviso = self._primeiro_aviso, None
+
+        self._ultimo = self._despertar = time.perf_counter_ns()
+        atraso = 0.0
+        if disparou and primeiro is not None:
+            atraso = (self._ultimo - primeiro) / 1e9
+            self.atrasos[(self.ticks_evento - 1) % JITTER_WINDOW] = atraso
+            self.atraso_total += atraso
+        self.ticks += 1
+        return atraso
+
+    def estatisticas_jitter(self):
+        """
+        Retorna:
+            Dicionário com p50, p99 e máximo (s) do atraso entre o aviso do Receiver e o tick,
+            além das contagens de ticks por evento e por keepalive.
+        """
+        return {
+            'ticks': self.ticks,
+            'eventos': self.ticks_evento,
+            'keepalive': self.ticks_keepalive,
+            **resumo_janela(*self.janela_jitter()),
+        }
+
+    def estatisticas_duracao(self):
+        """Retorna p50, p99 e máximo (s) do trabalho feito entre dois ticks (ver _resumo_duracao)."""
+        return _resumo_duracao(self)
+
+    def janela_jitter(self):
+        """
+        Retorna a janela circular dos atrasos e quantos atrasos já foram escritos nela. Só os
+        ticks por evento têm atraso, então a contagem é ticks_evento, não ticks.
+        """
+        return self.atrasos, self.ticks_evento
+
+    def janela_duracao(self):
+        """Retorna a janela circular das durações e quantas já foram escritas nela."""
+        return _janela_duracao(self)
+
+def resumo_janela(janela, n):
+    """
+    Descrição:
+        Resume uma janela circular de tempos (atrasos ou durações de tick).
+    Entradas:
+        janela: Array de JITTER_WINDOW posições escrito em n % JITTER_WINDOW
+        n:      Quantidade de valores já escritos na janela
+    Retorna:
+        Dicionário com p50, p99 e máximo (s) dos valores válidos (zeros se não houver nenhum).
+    """
+    valores = janela[:min(n, len(janela))]
+    if valores.size == 0:
+        return {'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+    return {
+        'p50': float(np.percentile(valores, 50)),
+        'p99': float(np.percentile(valores, 99)),
+        'max': float(valores.max()),
+    }
+
+def _registrar_duracao(agendador, agora):
+    """Guarda o tempo entre o último despertar e a chamada de esperar(): o trabalho do tick."""
+    duracao = (agora - agendador._despertar) / 1e9
+    agendador.duracoes[(agendador.ticks - 1) % JITTER_WINDOW] = duracao
+    agendador.duracao_total += duracao
+
+def _janela_duracao(agendador):
+    # O tick em andamento ainda não tem duração
+    return agendador.duracoes, max(agendador.ticks - 1, 0)
+
+def _resumo_duracao(agendador):
+    """
+    Retorna:
+        Dicionário com p50, p99 e máximo (s) da duração dos últimos JITTER_WINDOW ticks, medida
+        do despertar de um tick até a chamada seguinte de esperar().
+    """
+    return resumo_janela(*_janela_duracao(agendador))
@@ -0,0 +1,140 @@
+import sys
+import time
+import struct
+import threading
+import collections
+import numpy as np
+
+# Níveis de verbosidade: um registro só é guardado se o nível dele for <= ao do RegistroAssincrono
+NIVEL_NADA, NIVEL_RESUMO, NIVEL_DETALHE = range(3)
+
+LOG_FILA = 4096             # Registros pendentes; além disso os mais antigos são descartados
+LOG_CABECALHO = struct.Struct('<dBH')   # instante (s), tipo, quantidade de valores float64
+
+# ---------------------------------------------------------------------------------------------
+#    REGISTRO ASSÍNCRONO PARA O LAÇO DE CONTROLE
+# ---------------------------------------------------------------------------------------------
+
+class RegistroAssincrono:
+    """
+    Descrição:
+        Tira a formatação e a escrita de mensagens do laço de controle. O laço só enfileira
+        registros compactos (instante, tipo, valores); uma thread em segundo plano, a `taxa`
+        vezes por segundo, imprime o registro mais recente de cada tipo com o formatador
+        dele e, se houver arquivo binário, grava todos os registros. Acima do nível
+        configurado, registrar() retorna sem fazer nada.
+    Entradas:
+        nivel:      NIVEL_NADA, NIVEL_RESUMO ou NIVEL_DETALHE
+        taxa:       Impressões por segundo no terminal (0 desliga o texto)
+        arquivo:    Caminho do log binário (ver ler_log_binario) ou None
+        saida:      Fluxo de texto das impressões
+    """
+    def __init__(self, nivel=NIVEL_RESUMO, taxa=2.0, arquivo=None, saida=sys.stdout):
+        self.nivel = nivel
+        self.taxa = taxa
+        self.saida = saida
+        self.formatadores = {}
+
+        self._fila = collections.deque(maxlen=LOG_FILA)
+        self._arquivo = open(arquivo, 'wb') if arquivo else None
+        self._parada = threading.Event()
+
+        # Contadores
+        self.registros = 0
+        self.omitidos = 0       # Registros que não chegaram ao terminal por causa da taxa
+        self.descartados = 0    # Registros perdidos com a fila cheia (nem impressos nem gravados)
+
+        self.thread = None
+        if nivel > NIVEL_NADA:
+            self.thread = threading.Thread(target=self._executar, daemon=True)
+            self.thread.start()
+
+    def formatador(self, tipo, funcao):
+        """
+        Descrição:
+            Define como um tipo de registro aparece no terminal.
+        Entradas:
+            tipo:   Código do tipo (0 a 255)
+            funcao: Recebe os valores registrados e retorna o texto a imprimir
+        """
+        self.formatadores[tipo] = funcao
+
+    def registrar(self, nivel, tipo, valores):
+        """
+        Descrição:
+            Enfileira um registro sem formatar nem escrever nada. Os valores são guardados por
+            referência: passe um objeto que não será alterado depois (por exemplo, o retrato
+            de RobotStateStore.snapshot ou uma lista nova).
+        Entradas:
+            nivel:      Nível do registro
+            tipo:       Código do tipo (0 a 255)
+            valores:    Sequência de números (gravável no log binário)
+        """
+        if nivel > self.nivel:
+            return
+        if len(self._fila) == LOG_FILA:
+            self.descartados += 1
+        self._fila.append((time.monotonic(), tipo, valores))
+        self.registros += 1
+
+    def _executar(self):
+        intervalo = 1 / self.taxa if self.taxa else 0.5
+        while not self._parada.wait(intervalo):
+            self._esvaziar()
+        self._esvaziar()
+
+    def _esvaziar(self):
+        ultimos = {}
+        contagem = collections.Counter()
+        while self._fila:
+            try:
+                registro = self._fila.popleft()
+            except IndexError:
+                break
+            ultimos[registro[1]] = registro
+            contagem[registro[1]] += 1
+            if self._arquivo:
+                self._gravar(*registro)
+
+        if not self.taxa:
+            return
+        for tipo, (_, _, valores) in ultimos.items():
+            self.omitidos += contagem[tipo] - 1
+            funcao = self.formatadores.get(tipo)
+            self.saida.write((funcao(valores) if funcao else f"[{tipo}] {valores}") + '\n')
+        if ultimos:
+            self.saida.flush()
+
+    def _gravar(self, instante, tipo, valores):
+        valores = np.ravel(np.asarray(valores, dtype=np.float64))
+        self._arquivo.write(LOG_CABECALHO.pack(instante, tipo, valores.size))
+        self._arquivo.write(valores.tobytes())
+
+    def fechar(self):
+        """Imprime/grava o que estiver pendente e encerra a thread."""
+        self._parada.set()
+        if self.thread:
+            self.thread.join()
+        if self._arquivo:
+            self._arquivo.close()
+
+def ler_log_binario(caminho):
+    """
+    Descrição:
+        Lê um log gravado por RegistroAssincrono.
+    Entradas:
+        caminho:    Arquivo do log binário
+    Retorna:
+        Gerador de (instante, tipo, array de valores float64).
+    """
+    with open(caminho, 'rb') as arquivo:
+        dados = arquivo.read()
+
+    pos = 0
+    while pos + LOG_CABECALHO.size <= len(dados):
+        instante, tipo, n = LOG_CABECALHO.unpack_from(dados, pos)
+        pos += LOG_CABECALHO.size
+        if pos + 8 * n > len(dados):
+            break       # Registro incompleto no fim do arquivo
+        yield instante, tipo, np.frombuffer(dados, dtype=np.float64, count=n, offset=pos)
+        pos += 8 * n